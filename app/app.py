@@ -7,9 +7,21 @@ import os
 import time
 import logging
 from datetime import datetime
-from flask import Flask, jsonify, request, Response, render_template
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
-import json
+from flask import Flask, g, jsonify, request, Response, render_template
+from prometheus_client import Counter, Histogram, Gauge, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from profiling import init_profiling
+from runtime_metrics import GC_PAUSE_BUCKETS, install_runtime_metrics
+from traffic_capture import init_traffic_capture
+from response_cache import ResponseCache
+from live_status import StatusBroadcaster
+from datastore import REFRESH_BUCKETS, ChangeLog, DataStore
+from datasets import DatasetCatalog, InvalidDatasetName
+from user_stats import UserStats
+from search import UserIndex
+from latency_stats import LatencyStats
+from batch import BatchError, parse_batch, run_batch
+from records import RecordsJSONProvider
+from timing import STAGE_BUCKETS, parse_buckets, request_spans, server_timing_header, span
 
 # Configure structured logging
 logging.basicConfig(
@@ -20,6 +32,7 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = RecordsJSONProvider(app)
 
 # Initialize start time - compatible with Gunicorn
 if not hasattr(app, 'start_time'):
@@ -27,7 +40,35 @@ if not hasattr(app, 'start_time'):
 
 # Prometheus metrics
 REQUEST_COUNT = Counter('flask_requests_total', 'Total requests', ['method', 'endpoint', 'status'])
-REQUEST_DURATION = Histogram('flask_request_duration_seconds', 'Request duration', ['method', 'endpoint'])
+REQUEST_DURATION = Histogram(
+    'flask_request_duration_seconds', 'Request duration', ['method', 'endpoint'],
+    buckets=parse_buckets(os.getenv('REQUEST_DURATION_BUCKETS'), Histogram.DEFAULT_BUCKETS)
+)
+STAGE_DURATION = Histogram(
+    'flask_stage_duration_seconds', 'Time spent in each stage of a request', ['endpoint', 'stage'],
+    buckets=parse_buckets(os.getenv('STAGE_DURATION_BUCKETS'), STAGE_BUCKETS)
+)
+GC_PAUSE = Histogram(
+    'python_gc_pause_seconds', 'Garbage collection pause duration', ['generation'],
+    buckets=GC_PAUSE_BUCKETS
+)
+GC_COLLECTED = Counter('python_gc_collected_objects', 'Objects collected by the garbage collector', ['generation'])
+install_runtime_metrics(REGISTRY, GC_PAUSE, GC_COLLECTED)
+DATA_COALESCED = Counter(
+    'flask_data_load_coalesced', 'Requests that shared an in-flight data load instead of starting one', ['mode']
+)
+DATA_REFRESH_DURATION = Histogram(
+    'flask_data_refresh_duration_seconds', 'Time to read, parse and swap in data.json', ['mode'],
+    buckets=REFRESH_BUCKETS
+)
+DATASET_LOAD_DURATION = Histogram(
+    'flask_dataset_load_duration_seconds', 'Time to load a dataset on first access', ['dataset'],
+    buckets=REFRESH_BUCKETS
+)
+DATASET_RESIDENT_BYTES = Gauge('flask_dataset_resident_bytes', 'Approximate memory of a loaded dataset', ['dataset'])
+DATASET_EVICTIONS = Counter('flask_dataset_evictions', 'Datasets dropped to stay within the memory budget', ['dataset'])
+CACHE_REQUESTS = Counter('flask_response_cache_requests', 'Response cache lookups', ['route', 'result'])
+CACHE_EVICTIONS = Counter('flask_response_cache_evictions', 'Response cache evictions', ['route', 'tier'])
 ACTIVE_CONNECTIONS = Gauge('flask_active_connections', 'Active connections')
 APP_INFO = Gauge('flask_app_info', 'Application info', ['version', 'env'])
 
@@ -37,6 +78,51 @@ APP_INFO.labels(version='1.0.0', env=os.getenv('ENVIRONMENT', 'development')).se
 # Mock data counter for demonstration
 page_views = Counter('page_views_total', 'Total page views', ['page'])
 
+# Opt-in sampling profiler (PROFILING_MODE=requests|sampler), None when disabled
+profiler = init_profiling(app)
+
+# Full-response cache; RESPONSE_CACHE_DIR shares entries between workers
+response_cache = ResponseCache(
+    CACHE_REQUESTS, CACHE_EVICTIONS,
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(float(os.getenv('RESPONSE_CACHE_MAX_MB', 64)) * 1024 * 1024),
+    shared_dir=os.getenv('RESPONSE_CACHE_DIR') or None,
+    enabled=os.getenv('RESPONSE_CACHE', 'true').lower() == 'true'
+)
+
+# Parsed data.json, reloaded only when the file changes, by one load at a time
+data_store = DataStore(
+    os.getenv('DATA_FILE', '/app/data/data.json'),
+    check_interval=float(os.getenv('DATA_CHECK_INTERVAL', 1.0)),
+    change_log=ChangeLog(
+        max_versions=int(os.getenv('DATA_CHANGE_HISTORY', 100)),
+        max_records=int(os.getenv('DATA_CHANGE_MAX_RECORDS', 100000))
+    ),
+    stale_while_revalidate=os.getenv('DATA_STALE_WHILE_REVALIDATE', 'true').lower() == 'true',
+    coalesced_counter=DATA_COALESCED,
+    refresh_histogram=DATA_REFRESH_DURATION
+)
+user_stats = UserStats()
+data_store.add_listener(user_stats)
+user_index = UserIndex()
+data_store.add_listener(user_index)
+
+# Further datasets (<name>.json next to DATA_FILE), loaded on first request
+datasets = DatasetCatalog(
+    os.getenv('DATASETS_DIR') or os.path.dirname(data_store.path),
+    memory_budget=float(os.getenv('DATASET_MEMORY_BUDGET_MB', 256)) * 1024 * 1024,
+    load_histogram=DATASET_LOAD_DURATION,
+    resident_gauge=DATASET_RESIDENT_BYTES,
+    evictions_counter=DATASET_EVICTIONS,
+    check_interval=data_store.check_interval
+)
+
+# Rolling per-route latency percentiles for /debug/stats, None when disabled
+latency_stats = LatencyStats() if os.getenv('LATENCY_STATS', 'true').lower() == 'true' else None
+
+# Opt-in request capture for load replay (TRAFFIC_CAPTURE=true), None when disabled
+traffic_capture = init_traffic_capture(app)
+
 def track_metrics(func):
     """Decorator to track request metrics"""
     def wrapper(*args, **kwargs):
@@ -45,31 +131,58 @@ def track_metrics(func):
         
         try:
             response = func(*args, **kwargs)
-            status_code = getattr(response, 'status_code', 200)
+            if isinstance(response, tuple):
+                status_code = response[1]
+            else:
+                status_code = getattr(response, 'status_code', 200)
             REQUEST_COUNT.labels(
-                method='GET', 
+                method=request.method, 
                 endpoint=func.__name__, 
                 status=status_code
             ).inc()
             return response
         except Exception as e:
             REQUEST_COUNT.labels(
-                method='GET', 
+                method=request.method, 
                 endpoint=func.__name__, 
                 status=500
             ).inc()
             logger.error(f"Error in {func.__name__}: {str(e)}")
             raise
         finally:
+            elapsed = time.time() - start_time
             REQUEST_DURATION.labels(
-                method='GET', 
+                method=request.method, 
                 endpoint=func.__name__
-            ).observe(time.time() - start_time)
+            ).observe(elapsed)
             ACTIVE_CONNECTIONS.dec()
     
     wrapper.__name__ = func.__name__
     return wrapper
 
+@app.before_request
+def start_latency_timer():
+    if latency_stats is not None:
+        g.latency_start = time.perf_counter()
+
+@app.teardown_request
+def record_latency(exc):
+    """Record every matched route for /debug/stats, up to when its response is ready"""
+    start = g.pop('latency_start', None)
+    if start is not None and request.endpoint is not None:
+        latency_stats.record(request.endpoint, time.perf_counter() - start)
+
+@app.after_request
+def add_server_timing(response):
+    """Report stage spans as histograms and a Server-Timing header"""
+    spans = request_spans()
+    if spans:
+        endpoint = request.endpoint or 'unknown'
+        for stage, duration in spans:
+            STAGE_DURATION.labels(endpoint=endpoint, stage=stage).observe(duration)
+        response.headers['Server-Timing'] = server_timing_header(spans)
+    return response
+
 @app.route('/')
 def home():
     """Homepage endpoint"""
@@ -77,7 +190,13 @@ def home():
     
     logger.info("Homepage accessed")
     
-    return render_template('index.html')
+    return render_home()
+
+@response_cache.cached(ttl=int(os.getenv('HOME_CACHE_TTL', 60)), vary=('Accept-Encoding',))
+def render_home():
+    """Rendered dashboard page"""
+    with span('render'):
+        return render_template('index.html')
 
 @app.route('/health')
 @track_metrics
@@ -86,18 +205,84 @@ def health_check():
     logger.info("Health check accessed")
     
     # Simulate basic health checks
-    health_status = {
+    with span('checks'):
+        health_status = {
+            'status': 'healthy',
+            'timestamp': datetime.utcnow().isoformat(),
+            'uptime': time.time() - getattr(app, 'start_time', time.time()),
+            'checks': {
+                'database': 'ok',  # Mock database check
+                'memory': 'ok',
+                'disk': 'ok'
+            }
+        }
+    
+    with span('encode'):
+        return jsonify(health_status), 200
+
+def status_snapshot():
+    """Compact health/traffic summary for the dashboard"""
+    requests_total = 0
+    for metric in REQUEST_COUNT.collect():
+        requests_total += sum(sample.value for sample in metric.samples if sample.name == 'flask_requests_total')
+    
+    latency = {}
+    for metric in REQUEST_DURATION.collect():
+        for sample in metric.samples:
+            endpoint = sample.labels.get('endpoint')
+            if sample.name.endswith('_count'):
+                latency.setdefault(endpoint, {})['count'] = int(sample.value)
+            elif sample.name.endswith('_sum'):
+                latency.setdefault(endpoint, {})['sum'] = sample.value
+    latency = {
+        endpoint: {'count': stats['count'], 'avg_ms': round(stats['sum'] / stats['count'] * 1000, 3)}
+        for endpoint, stats in latency.items() if stats.get('count')
+    }
+    
+    return {
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
         'uptime': time.time() - getattr(app, 'start_time', time.time()),
-        'checks': {
-            'database': 'ok',  # Mock database check
-            'memory': 'ok',
-            'disk': 'ok'
-        }
+        'requests_total': int(requests_total),
+        'latency': latency
     }
-    
-    return jsonify(health_status), 200
+
+def stream_subscriber_limit():
+    """Open streams allowed per worker; each holds a thread, so half are kept for requests"""
+    threads = int(os.getenv('GUNICORN_THREADS', 16))
+    ceiling = threads - max(1, threads // 2)
+    configured = os.getenv('STATUS_STREAM_MAX_SUBSCRIBERS')
+    if configured is None:
+        return ceiling
+    if int(configured) > ceiling:
+        logger.warning(f"STATUS_STREAM_MAX_SUBSCRIBERS={configured} would leave too few of the "
+                       f"{threads} worker threads for requests, using {ceiling}")
+        return ceiling
+    return int(configured)
+
+# Live status fan-out for dashboards (one snapshot per interval per worker)
+live_status = StatusBroadcaster(
+    status_snapshot,
+    interval=float(os.getenv('STATUS_STREAM_INTERVAL', 5)),
+    max_subscribers=stream_subscriber_limit()
+)
+
+@app.route('/api/status')
+def status():
+    """Current status snapshot (polling fallback for the stream)"""
+    return jsonify(status_snapshot())
+
+@app.route('/api/status/stream')
+def status_stream():
+    """Server-Sent Events stream of status snapshots"""
+    if not live_status.try_subscribe():
+        return jsonify({'error': 'Too many subscribers'}), 503
+    response = Response(live_status.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(live_status.unsubscribe)
+    return response
 
 @app.route('/metrics')
 def metrics():
@@ -105,6 +290,36 @@ def metrics():
     logger.info("Metrics endpoint accessed")
     return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
 
+@app.route('/debug/profile')
+def debug_profile():
+    """Profiling results: collapsed stacks (default) or a JSON report"""
+    if profiler is None:
+        return jsonify({'error': 'Not found'}), 404
+    if not profiler.authorized(request):
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if request.args.get('format') == 'json':
+        response = jsonify(profiler.report(max(request.args.get('limit', 20, type=int), 1)))
+    else:
+        response = Response(profiler.sampler.collapsed(), mimetype='text/plain')
+    
+    if request.args.get('reset') == 'true':
+        profiler.sampler.reset()
+    return response
+
+@app.route('/debug/stats')
+def debug_stats():
+    """Rolling p50/p90/p99/max latency and RPS per route (every matched endpoint), for this worker"""
+    if latency_stats is None:
+        return jsonify({'error': 'Not found'}), 404
+    
+    return jsonify({
+        'pid': os.getpid(),
+        'windows': [name for name, _ in latency_stats.windows],
+        'routes': latency_stats.snapshot(),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
 @app.route('/robots.txt')
 def robots():
     return Response('User-agent: *\nAllow: /', mimetype='text/plain')
@@ -119,25 +334,133 @@ def get_data():
     """Mock API endpoint that returns sample data"""
     page_views.labels(page='api').inc()
     
+    return data_response()
+
+@response_cache.cached(ttl=float(os.getenv('API_DATA_CACHE_TTL', 2)), vary=('Accept-Encoding',))
+def data_response():
+    """JSON body for /api/data"""
     try:
-        # Read mock data
-        with open('/app/data/data.json', 'r') as f:
-            data = json.load(f)
+        data, version = data_store.get_versioned()
         
         logger.info("API data accessed successfully")
+        with span('encode'):
+            return jsonify({
+                'success': True,
+                'data': data,
+                'version': version,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+    except FileNotFoundError:
+        logger.warning("Data file not found, returning mock data")
         return jsonify({
             'success': True,
-            'data': data,
+            'data': {'message': 'Mock data - file not found'},
             'timestamp': datetime.utcnow().isoformat()
         })
+
+@app.route('/api/data/changes')
+@track_metrics
+def get_data_changes():
+    """Records changed since a version from /api/data, or a full snapshot"""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({'success': False, 'error': 'Missing or invalid since parameter'}), 400
+    
+    try:
+        with span('diff'):
+            changes = data_store.changes_since(since)
     except FileNotFoundError:
-        logger.warning("Data file not found, returning mock data")
+        return jsonify({'success': False, 'error': 'Data file not found'}), 404
+    
+    with span('encode'):
         return jsonify({
             'success': True,
-            'data': {'message': 'Mock data - file not found'},
+            **changes,
             'timestamp': datetime.utcnow().isoformat()
         })
 
+@app.route('/api/data/<dataset>')
+@track_metrics
+def get_dataset(dataset):
+    """One named dataset from the data directory"""
+    try:
+        data, version = datasets.get(dataset)
+    except InvalidDatasetName:
+        return jsonify({'success': False, 'error': 'Invalid dataset name'}), 400
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': f'Dataset {dataset} not found'}), 404
+    except ValueError as e:
+        logger.error(f"Dataset {dataset} could not be parsed: {str(e)}")
+        return jsonify({'success': False, 'error': f'Dataset {dataset} is not valid JSON'}), 500
+    
+    with span('encode'):
+        return jsonify({
+            'success': True,
+            'dataset': dataset,
+            'data': data,
+            'version': version,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+@app.route('/api/stats')
+@track_metrics
+def get_stats():
+    """Aggregate user statistics, maintained incrementally"""
+    try:
+        data_store.get()
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'Data file not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'stats': user_stats.snapshot(request.args.get('top_domains', 20, type=int)),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@app.route('/api/users/search')
+@track_metrics
+def search_users():
+    """Search users by name or email; the last word matches as a prefix"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'Missing query parameter q'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    
+    try:
+        data_store.get()
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'Data file not found'}), 404
+    
+    with span('search'):
+        user_ids, truncated = user_index.search(query, limit)
+        # A reload may have removed a user between the lookup and here
+        users = [user for user in map(data_store.users.get, user_ids) if user is not None]
+    return jsonify({
+        'success': True,
+        'query': query,
+        'results': users,
+        'truncated': truncated
+    })
+
+@app.route('/api/batch', methods=['POST'])
+@track_metrics
+def batch():
+    """Run several GET sub-requests in one round trip"""
+    try:
+        specs = parse_batch(request.get_json(silent=True), int(os.getenv('BATCH_MAX_REQUESTS', 20)), app.url_map)
+    except BatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Sub-requests go through the full WSGI stack, so each one is counted and timed on its own
+    headers = {name: value for name, value in request.headers.items() if name in ('User-Agent', 'Accept-Language')}
+    with span('dispatch'):
+        results = run_batch(app, specs, request.host_url, headers, int(os.getenv('BATCH_CONCURRENCY', 4)))
+    return jsonify({
+        'success': True,
+        'results': results,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
 @app.errorhandler(404)
 def not_found(error):
     """404 error handler"""
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+In-process execution of batched GET sub-requests
+Each sub-request runs through the app's full WSGI stack (hooks, metrics,
+caching), so it is observed exactly like a standalone request.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+# Endpoints that can't be embedded in a batch response
+EXCLUDED_ENDPOINTS = ('batch', 'status_stream')
+
+class BatchError(ValueError):
+    """Invalid batch request body"""
+
+def _environ(base_url, headers, path, query_string):
+    return EnvironBuilder(
+        path=path, query_string=query_string, method='GET', base_url=base_url, headers=headers
+    ).get_environ()
+
+def _endpoint(url_map, path, query_string):
+    """Endpoint a path resolves to, decoded exactly as dispatch will decode it"""
+    adapter = url_map.bind_to_environ(_environ(None, None, path, query_string))
+    try:
+        endpoint, _ = adapter.match()
+    except HTTPException:
+        # 404, 405 and redirects are answered normally by the sub-request
+        return None
+    return endpoint
+
+def parse_batch(body, max_requests, url_map):
+    """Validate a batch body into a list of (path, query_string) pairs"""
+    if not isinstance(body, dict) or not isinstance(body.get('requests'), list):
+        raise BatchError("Body must be a JSON object with a 'requests' list")
+    specs = body['requests']
+    if not specs:
+        raise BatchError("'requests' must not be empty")
+    if len(specs) > max_requests:
+        raise BatchError(f"At most {max_requests} sub-requests per batch")
+
+    parsed = []
+    for spec in specs:
+        if isinstance(spec, str):
+            spec = {'path': spec}
+        if not isinstance(spec, dict) or not isinstance(spec.get('path'), str) or not spec['path'].startswith('/'):
+            raise BatchError("Each sub-request needs an absolute 'path'")
+        if spec.get('method', 'GET').upper() != 'GET':
+            raise BatchError("Only GET sub-requests are supported")
+        path, _, query_string = spec['path'].partition('?')
+        if isinstance(spec.get('query'), dict):
+            query_string = urlencode(spec['query'])
+        if _endpoint(url_map, path, query_string) in EXCLUDED_ENDPOINTS:
+            raise BatchError(f"{path} can't be batched")
+        parsed.append((path, query_string))
+    return parsed
+
+def _dispatch(app, base_url, headers, path, query_string):
+    environ = _environ(base_url, headers, path, query_string)
+    start = time.perf_counter()
+    response = app.response_class.from_app(app.wsgi_app, environ)
+    if response.mimetype == 'text/event-stream':
+        # Never buffer an endless stream, whatever route produced it
+        response.close()
+        return {
+            'path': path + (f"?{query_string}" if query_string else ''),
+            'status': 400,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            'content_type': 'application/json',
+            'body': {'success': False, 'error': 'Streaming responses can\'t be batched'}
+        }
+    response.get_data()
+    response.close()
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    if response.is_json:
+        body = response.get_json(silent=True)
+    else:
+        body = response.get_data(as_text=True)
+    return {
+        'path': path + (f"?{query_string}" if query_string else ''),
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 3),
+        'content_type': response.content_type,
+        'body': body
+    }
+
+def run_batch(app, specs, base_url, headers, max_workers):
+    """Run sub-requests concurrently; results keep the request order"""
+    if len(specs) == 1 or max_workers <= 1:
+        return [_dispatch(app, base_url, headers, path, query) for path, query in specs]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(specs))) as pool:
+        futures = [pool.submit(_dispatch, app, base_url, headers, path, query) for path, query in specs]
+        return [future.result() for future in futures]
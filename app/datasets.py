@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Catalog of named datasets served from one data directory
+Each <name>.json gets its own DataStore, created on first access. Parsed
+datasets stay resident in LRU order until their combined approximate size
+exceeds the memory budget, then the least recently used are dropped and
+reloaded on their next request.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from datastore import DataStore
+from records import approx_size
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Letters, digits, '-' and '_' only: names map straight to file names
+DATASET_NAME = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]{0,63}')
+
+class InvalidDatasetName(ValueError):
+    """Dataset name that doesn't map to a file in the data directory"""
+
+class _Dataset:
+    __slots__ = ('store', 'version', 'size')
+
+    def __init__(self, store, version, size):
+        self.store = store
+        self.version = version
+        self.size = size
+
+class DatasetCatalog:
+    def __init__(self, directory, memory_budget, load_histogram, resident_gauge, evictions_counter,
+                 check_interval=1.0):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.check_interval = check_interval
+        self.resident_bytes = 0
+        self._load_duration = load_histogram
+        self._resident = resident_gauge
+        self._evictions = evictions_counter
+        self._datasets = OrderedDict()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """(document, version) of a dataset
+
+        Raises InvalidDatasetName for bad names, FileNotFoundError if there is
+        no such file and ValueError if it isn't valid JSON.
+        """
+        if not DATASET_NAME.fullmatch(name):
+            raise InvalidDatasetName(f"Invalid dataset name: {name}")
+        with self._lock:
+            dataset = self._datasets.get(name)
+            if dataset is not None:
+                self._datasets.move_to_end(name)
+        if dataset is None:
+            dataset, _ = self._flight.do(name, lambda: self._load(name))
+
+        document, version = dataset.store.get_versioned()
+        if version != dataset.version:
+            # Reloaded since it was last measured
+            self._resize(name, dataset, version, approx_size(document))
+        return document, version
+
+    def _load(self, name):
+        path = os.path.join(self.directory, f"{name}.json")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+        store = DataStore(path, check_interval=self.check_interval)
+        start = time.perf_counter()
+        document, version = store.get_versioned()
+        self._load_duration.labels(dataset=name).observe(time.perf_counter() - start)
+
+        dataset = _Dataset(store, version, approx_size(document))
+        with self._lock:
+            self._datasets[name] = dataset
+            self.resident_bytes += dataset.size
+            self._resident.labels(dataset=name).set(dataset.size)
+            self._evict(keep=name)
+        logger.info(f"Loaded dataset {name} ({dataset.size} bytes, {self.resident_bytes} resident)")
+        return dataset
+
+    def _resize(self, name, dataset, version, size):
+        with self._lock:
+            if self._datasets.get(name) is not dataset:
+                # Evicted meanwhile; the caller still holds a usable document
+                return
+            self.resident_bytes += size - dataset.size
+            dataset.version, dataset.size = version, size
+            self._resident.labels(dataset=name).set(size)
+            self._evict(keep=name)
+
+    def _evict(self, keep):
+        """Drop least recently used datasets until within budget (caller holds the lock)"""
+        while self.resident_bytes > self.memory_budget and len(self._datasets) > 1:
+            name, dataset = next(iter(self._datasets.items()))
+            if name == keep:
+                self._datasets.move_to_end(name)
+                continue
+            del self._datasets[name]
+            self.resident_bytes -= dataset.size
+            self._resident.remove(name)
+            self._evictions.labels(dataset=name).inc()
+            logger.info(f"Evicted dataset {name} ({dataset.size} bytes)")
+        if self.resident_bytes > self.memory_budget:
+            logger.warning(f"Dataset {keep} alone exceeds the memory budget ({self.resident_bytes} > {self.memory_budget} bytes)")
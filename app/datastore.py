@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+File-backed store for data.json
+The file is parsed once and only re-read when its size or mtime changes.
+Users are held as compact columns (records.UserColumns) rather than dicts;
+documents without a list of user objects under "users" are left as parsed.
+Listeners keep derived structures (aggregates, indexes) in sync: they are
+reset from the full user list on the first load, and afterwards receive only
+the user records that were added, updated or removed. If an update fails,
+every listener is rebuilt from the full list, so none is left a change ahead.
+
+Every load gets a new, increasing version. A bounded ChangeLog remembers
+which records and top-level sections changed in recent versions, so polling
+clients can fetch just the changes since the version they last saw.
+
+Loads are single-flight: concurrent requests that notice a change share one
+read and parse. Once a document exists, the reload runs in the background
+and requests keep getting the previous version until it is swapped in
+(stale-while-revalidate).
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+
+from timing import span
+from records import UserColumns, diff_users, usable_id
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Full reloads of large files take seconds, not milliseconds
+REFRESH_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def compact_users(document):
+    """Swap a document's list of user objects for UserColumns; empty columns if it has none"""
+    users = document.get('users') if isinstance(document, dict) else None
+    if not isinstance(users, list) or not all(isinstance(user, dict) for user in users):
+        return UserColumns()
+    columns = document['users'] = UserColumns.from_dicts(users)
+    return columns
+
+Change = namedtuple('Change', 'previous version added updated removed sections')
+
+# Published as one attribute so a reader never pairs one load's document with another's version
+Snapshot = namedtuple('Snapshot', 'document version users')
+
+class ChangeLog:
+    """Bounded history of the record ids and sections changed by each version"""
+    def __init__(self, max_versions=100, max_records=100000):
+        self.max_versions = max_versions
+        self.max_records = max_records
+        self._changes = deque()
+        self._records = 0
+
+    def record(self, previous, version, added, updated, removed, sections):
+        size = len(added) + len(updated) + len(removed)
+        if size > self.max_records:
+            # Too big to keep; clients further back get a full snapshot
+            self.clear()
+            return
+        self._changes.append(Change(previous, version, added, updated, removed, sections))
+        self._records += size
+        while len(self._changes) > self.max_versions or self._records > self.max_records:
+            oldest = self._changes.popleft()
+            self._records -= len(oldest.added) + len(oldest.updated) + len(oldest.removed)
+
+    def clear(self):
+        self._changes.clear()
+        self._records = 0
+
+    def since(self, version):
+        """Net changes after version as ({id: existed_at_version}, sections), or None if not covered"""
+        changes = list(self._changes)
+        for start, change in enumerate(changes):
+            if change.previous == version:
+                break
+        else:
+            return None
+
+        existed, sections = {}, set()
+        for change in changes[start:]:
+            for user_id in change.added:
+                existed.setdefault(user_id, False)
+            for user_id in change.updated + change.removed:
+                existed.setdefault(user_id, True)
+            sections.update(change.sections)
+        return existed, sections
+
+class DataStore:
+    def __init__(self, path, check_interval=1.0, change_log=None, stale_while_revalidate=True,
+                 coalesced_counter=None, refresh_histogram=None):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = Snapshot(None, 0, UserColumns())
+        self.changes = change_log or ChangeLog()
+        self.stale_while_revalidate = stale_while_revalidate
+        self._coalesced = coalesced_counter
+        self._refresh_duration = refresh_histogram
+        self._flight = SingleFlight()
+        self._signature = None
+        self._checked_at = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def document(self):
+        return self._snapshot.document
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    @property
+    def users(self):
+        return self._snapshot.users
+
+    def add_listener(self, listener):
+        """Register an object with reset(users) and apply(added, updated, removed)"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self.document is not None:
+                listener.reset(self.users.iter_dicts())
+
+    def get(self):
+        """Current document; raises FileNotFoundError if there has never been one"""
+        self.refresh()
+        document = self.document
+        if document is None:
+            raise FileNotFoundError(self.path)
+        return document
+
+    def get_versioned(self):
+        """Current (document, version); raises FileNotFoundError if there has never been one"""
+        self.refresh()
+        snapshot = self._snapshot
+        if snapshot.document is None:
+            raise FileNotFoundError(self.path)
+        return snapshot.document, snapshot.version
+
+    def changes_since(self, since):
+        """Records and sections changed after version since, or a full snapshot if that is unknown"""
+        self.refresh()
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot.document is None:
+                raise FileNotFoundError(self.path)
+            if since == snapshot.version:
+                net = {}, set()
+            else:
+                net = self.changes.since(since)
+            if net is None:
+                return {'full': True, 'version': snapshot.version, 'data': snapshot.document}
+
+            existed, sections = net
+            added, updated, removed = [], [], []
+            for user_id, was_present in existed.items():
+                user = snapshot.users.get(user_id)
+                if user is None:
+                    if was_present:
+                        removed.append(user_id)
+                elif was_present:
+                    updated.append(user)
+                else:
+                    added.append(user)
+            return {
+                'full': False,
+                'since': since,
+                'version': snapshot.version,
+                'added': added,
+                'updated': updated,
+                'removed': removed,
+                'sections': {key: snapshot.document.get(key) for key in sorted(sections)}
+            }
+
+    def refresh(self):
+        """Reload the file if it changed since the last check"""
+        now = time.monotonic()
+        if self.document is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+
+        if self.document is not None and self.stale_while_revalidate:
+            # Keep serving the current version while one background load runs
+            if not self._flight.do_async('load', lambda: self._load(signature, 'background')):
+                self._count_coalesced('stale')
+            return
+        _, shared = self._flight.do('load', lambda: self._load(signature, 'foreground'))
+        if shared:
+            self._count_coalesced('wait')
+
+    def _update_listeners(self, users, changes=None):
+        """Bring every listener to users, or to none of it; caller holds self._lock"""
+        try:
+            if changes is not None:
+                try:
+                    for listener in self._listeners:
+                        listener.apply(*changes)
+                    return
+                except Exception as e:
+                    logger.warning(f"Incremental listener update failed, rebuilding: {str(e)}")
+            for listener in self._listeners:
+                listener.reset(users.iter_dicts())
+        except Exception:
+            # Some listeners may hold the new records; put them all back on the
+            # ones still being served so a retried reload starts clean
+            for listener in self._listeners:
+                listener.reset(self.users.iter_dicts())
+            raise
+
+    def _count_coalesced(self, mode):
+        if self._coalesced is not None:
+            self._coalesced.labels(mode=mode).inc()
+
+    def _load(self, signature, mode):
+        if signature == self._signature:
+            # Loaded by the flight that just finished
+            return
+        start = time.perf_counter()
+        try:
+            self._read(signature)
+        except Exception as e:
+            if mode == 'foreground':
+                raise
+            logger.error(f"Background reload of {self.path} failed: {str(e)}")
+        finally:
+            if self._refresh_duration is not None:
+                self._refresh_duration.labels(mode=mode).observe(time.perf_counter() - start)
+
+    def _read(self, signature):
+        with span('read'):
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        try:
+            with span('parse'):
+                document = json.loads(raw)
+        except ValueError as e:
+            # Leave the signature alone so a half-written file is retried
+            if self.document is None:
+                raise
+            logger.warning(f"Could not parse {self.path}, serving previous version: {str(e)}")
+            return
+
+        with span('compact'):
+            users = compact_users(document)
+        # mtime usually gives every worker the same version for a file, and
+        # microseconds keep it exact as a JavaScript number; when the mtime isn't
+        # newer, this worker's versions step past it and stop matching the others
+        version = max(signature[0] // 1000, self.version + 1)
+        # Only one load runs at a time, so self.users is stable while diffing
+        changes = None if self.document is None else diff_users(self.users, users)
+        with self._lock:
+            if changes is None:
+                self._update_listeners(users)
+            else:
+                added, updated, removed = changes
+                # Work out the change log entry before touching any listener
+                changed = added + [new for _, new in updated] + removed
+                if not all(usable_id(user.get('id')) for user in changed):
+                    # A delta can't name records without an id; older versions get a full snapshot
+                    entry = None
+                elif isinstance(document, dict) and isinstance(self.document, dict):
+                    # Compacted users are covered by the record diff; anything else is a section
+                    compacted = all(isinstance(doc.get('users'), UserColumns) for doc in (document, self.document))
+                    sections = [
+                        key for key in document.keys() | self.document.keys()
+                        if not (compacted and key == 'users') and document.get(key) != self.document.get(key)
+                    ]
+                    entry = (
+                        [user['id'] for user in added],
+                        [new['id'] for _, new in updated],
+                        [user['id'] for user in removed],
+                        sections
+                    )
+                else:
+                    # No sections to diff; older versions get a full snapshot
+                    entry = None
+                self._update_listeners(users, changes)
+                if entry is None:
+                    self.changes.clear()
+                else:
+                    self.changes.record(self.version, version, *entry)
+                logger.info(f"Reloaded {self.path}: {len(added)} added, {len(updated)} updated, {len(removed)} removed")
+
+            self._snapshot = Snapshot(document, version, users)
+            self._signature = signature
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Rolling per-route latency percentiles without Prometheus
+Each route keeps a ring of 10-second slots covering the longest window.
+A slot holds a log-bucket histogram (16 sub-buckets per power of two, so
+percentiles are within ~3%) plus count, sum and max. Recording is one lock
+and a few dict updates; memory per route is bounded by slots x buckets.
+"""
+
+import math
+import time
+import threading
+
+SLOT_SECONDS = 10
+WINDOWS = (('1m', 60), ('5m', 300), ('15m', 900))
+PERCENTILES = (50, 90, 99)
+SUB_BUCKETS = 16
+# Latencies are bucketed in microseconds, up to 2**28 us (~4.5 minutes)
+MAX_BUCKET = 29 * SUB_BUCKETS - 1
+
+def bucket_of(seconds):
+    mantissa, exponent = math.frexp(seconds * 1e6)
+    if exponent <= 0:
+        return 0
+    return min(exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS), MAX_BUCKET)
+
+def bucket_value(bucket):
+    """Midpoint of a bucket in seconds"""
+    exponent, sub = divmod(bucket, SUB_BUCKETS)
+    return math.ldexp(0.5 + (sub + 0.5) / (2 * SUB_BUCKETS), exponent) / 1e6
+
+class _Slot:
+    __slots__ = ('epoch', 'count', 'max', 'buckets')
+
+    def __init__(self):
+        self.epoch = -1
+        self.count = 0
+        self.max = 0.0
+        self.buckets = {}
+
+class RouteStats:
+    def __init__(self, slot_count):
+        self.slots = [_Slot() for _ in range(slot_count)]
+        self.lock = threading.Lock()
+
+    def record(self, epoch, seconds):
+        bucket = bucket_of(seconds)
+        with self.lock:
+            slot = self.slots[epoch % len(self.slots)]
+            if slot.epoch != epoch:
+                slot.epoch = epoch
+                slot.count = 0
+                slot.max = 0.0
+                slot.buckets = {}
+            slot.count += 1
+            if seconds > slot.max:
+                slot.max = seconds
+            slot.buckets[bucket] = slot.buckets.get(bucket, 0) + 1
+
+    def merged(self, oldest_epoch):
+        """Count, max and merged buckets of the slots from oldest_epoch on"""
+        count, maximum, buckets = 0, 0.0, {}
+        with self.lock:
+            for slot in self.slots:
+                if slot.epoch < oldest_epoch:
+                    continue
+                count += slot.count
+                maximum = max(maximum, slot.max)
+                for bucket, n in slot.buckets.items():
+                    buckets[bucket] = buckets.get(bucket, 0) + n
+        return count, maximum, buckets
+
+class LatencyStats:
+    def __init__(self, windows=WINDOWS, slot_seconds=SLOT_SECONDS):
+        self.windows = windows
+        self.slot_seconds = slot_seconds
+        self.slot_count = max(seconds for _, seconds in windows) // slot_seconds + 1
+        self.started = time.monotonic()
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds):
+        stats = self.routes.get(route)
+        if stats is None:
+            with self._lock:
+                stats = self.routes.setdefault(route, RouteStats(self.slot_count))
+        stats.record(int(time.monotonic() // self.slot_seconds), seconds)
+
+    def snapshot(self):
+        """Per-route count, RPS and p50/p90/p99/max in milliseconds for each window"""
+        now = time.monotonic()
+        current = int(now // self.slot_seconds)
+        routes = {}
+        for route, stats in sorted(self.routes.items()):
+            routes[route] = {}
+            for name, seconds in self.windows:
+                # Whole slots, so a window is accurate to one slot
+                slots = seconds // self.slot_seconds
+                count, maximum, buckets = stats.merged(current - slots + 1)
+                elapsed = min(seconds, now - self.started)
+                routes[route][name] = self._summary(count, maximum, buckets, elapsed)
+        return routes
+
+    @staticmethod
+    def _summary(count, maximum, buckets, elapsed):
+        summary = {'count': count, 'rps': round(count / elapsed, 3) if elapsed > 0 else 0.0}
+        ranks = {pct: max(1, math.ceil(pct / 100 * count)) for pct in PERCENTILES}
+        values = dict.fromkeys(PERCENTILES)
+        seen = 0
+        for bucket in sorted(buckets):
+            seen += buckets[bucket]
+            for pct, rank in ranks.items():
+                if values[pct] is None and seen >= rank:
+                    values[pct] = min(bucket_value(bucket), maximum)
+        for pct in PERCENTILES:
+            summary[f'p{pct}_ms'] = None if values[pct] is None else round(values[pct] * 1000, 3)
+        summary['max_ms'] = round(maximum * 1000, 3) if count else None
+        return summary
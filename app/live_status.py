@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events fan-out of a periodic status snapshot
+One background thread per worker computes and serialises the snapshot once
+per interval; every subscriber receives the same pre-encoded message.
+The thread only runs while someone is subscribed.
+"""
+
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class StatusBroadcaster:
+    def __init__(self, snapshot_fn, interval=5.0, heartbeat=15.0, max_subscribers=100):
+        self.snapshot_fn = snapshot_fn
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self._message = None
+        self._version = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='status-broadcaster', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Idle until someone subscribes
+                self._cond.wait_for(lambda: self.subscribers > 0)
+            try:
+                payload = json.dumps(self.snapshot_fn(), separators=(',', ':'))
+            except Exception as e:
+                logger.error(f"Status snapshot failed: {str(e)}")
+            else:
+                with self._cond:
+                    self._version += 1
+                    self._message = f"id: {self._version}\ndata: {payload}\n\n"
+                    self._cond.notify_all()
+            time.sleep(self.interval)
+
+    def try_subscribe(self):
+        """Reserve a subscriber slot; False when the worker is at capacity"""
+        with self._cond:
+            if self.subscribers >= self.max_subscribers:
+                return False
+            self.subscribers += 1
+            self._ensure_running()
+            self._cond.notify_all()
+            return True
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def stream(self):
+        """SSE generator for one subscriber (after try_subscribe; unsubscribe on close)"""
+        yield f"retry: {int(self.interval * 1000)}\n\n"
+        with self._cond:
+            last_seen = self._version
+            message = self._message
+        if message is not None:
+            yield message
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._version != last_seen, timeout=self.heartbeat)
+                if self._version == last_seen:
+                    message = None
+                else:
+                    last_seen = self._version
+                    message = self._message
+            # Comment lines keep proxies from closing an idle stream
+            yield message if message is not None else ": keepalive\n\n"
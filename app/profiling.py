@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Opt-in sampling profiler for the Flask app
+
+PROFILING_MODE=requests  samples the stacks of a fraction of requests (PROFILE_SAMPLE_RATE)
+PROFILING_MODE=sampler   samples every thread in the background
+PROFILING_MODE=off       (default) registers nothing, so there is no per-request cost
+
+Stacks are aggregated in collapsed format ("root;caller;callee count"), which
+flamegraph.pl and speedscope read directly.
+"""
+
+import os
+import sys
+import hmac
+import time
+import random
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class StackSampler:
+    def __init__(self, interval, max_depth=64, all_threads=False):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.all_threads = all_threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._watched = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def watch(self, ident):
+        with self._lock:
+            self._watched.add(ident)
+
+    def unwatch(self, ident):
+        with self._lock:
+            self._watched.discard(ident)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            self.sample(own_ident)
+
+    def sample(self, own_ident=None):
+        """Take one sample of the watched (or all) threads"""
+        if not self.all_threads and not self._watched:
+            return
+        with self._lock:
+            watched = None if self.all_threads else set(self._watched)
+        frames = sys._current_frames()
+        collected = []
+        for ident, frame in frames.items():
+            if ident == own_ident or (watched is not None and ident not in watched):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            collected.append(';'.join(reversed(stack)))
+        with self._lock:
+            self.stacks.update(collected)
+            self.samples += len(collected)
+
+    def collapsed(self):
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+    def top(self, limit=20):
+        with self._lock:
+            return [{'stack': stack, 'samples': count} for stack, count in self.stacks.most_common(limit)]
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+class Profiler:
+    def __init__(self, mode, sample_rate, interval, token, trace_allocations):
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.token = token
+        self.sampler = StackSampler(interval, all_threads=(mode == 'sampler'))
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', 1)))
+
+    def authorized(self, request):
+        """Check the X-Profile-Token header (or ?token=) against PROFILE_TOKEN"""
+        if not self.token:
+            return False
+        supplied = request.headers.get('X-Profile-Token') or request.args.get('token', '')
+        return hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def before_request(self):
+        if random.random() < self.sample_rate:
+            g.profiled = True
+            self.sampler.watch(threading.get_ident())
+
+    def teardown_request(self, exc):
+        if g.pop('profiled', False):
+            self.sampler.unwatch(threading.get_ident())
+
+    def allocations(self, limit=20):
+        """Top allocation sites by size, if tracemalloc is on"""
+        if not tracemalloc.is_tracing():
+            return []
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+        return [
+            {'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+            for stat in stats
+        ]
+
+    def report(self, limit=20):
+        return {
+            'pid': os.getpid(),
+            'mode': self.mode,
+            'samples': self.sampler.samples,
+            'top_stacks': self.sampler.top(limit),
+            'allocations': self.allocations(limit)
+        }
+
+def init_profiling(app):
+    """Set up profiling from PROFILING_* settings; returns None when disabled"""
+    mode = os.getenv('PROFILING_MODE', 'off').lower()
+    if mode not in ('requests', 'sampler'):
+        return None
+
+    profiler = Profiler(
+        mode=mode,
+        sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0.01)),
+        interval=float(os.getenv('PROFILE_INTERVAL_SECONDS', 0.01)),
+        token=os.getenv('PROFILE_TOKEN', ''),
+        trace_allocations=os.getenv('PROFILE_TRACEMALLOC', 'false').lower() == 'true'
+    )
+    if mode == 'requests':
+        app.before_request(profiler.before_request)
+        app.teardown_request(profiler.teardown_request)
+    profiler.sampler.start()
+
+    if not profiler.token:
+        logger.warning("Profiling enabled but PROFILE_TOKEN is not set; /debug/profile will refuse all requests")
+    return profiler
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Compact column storage for the users collection
+json.load gives every user its own dict; at a million users that overhead
+dominates a worker's memory. UserColumns keeps one array or list per field
+instead: ids and created_at (as epoch seconds) in int arrays, repeated names
+and email domains interned, and dicts materialised only when a record is
+serialised or handed to a listener.
+"""
+
+import sys
+import time
+import calendar
+from array import array
+from bisect import bisect_left
+from collections.abc import Hashable
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+def usable_id(user_id):
+    """Whether an id can key a record; missing and object or array ids can't"""
+    return user_id is not None and isinstance(user_id, Hashable)
+
+class UserColumns:
+    def __init__(self):
+        self.ids = array('q')
+        self.names = []
+        self.email_locals = []
+        self.email_domains = array('I')
+        self.created = array('q')
+        # Domain 0 marks an email without '@' (stored whole in email_locals)
+        self._domains = [None]
+        self._domain_index = {}
+        self._names = {}
+        # Rows that don't fit the columns are kept verbatim
+        self._irregular = {}
+        self._sorted = True
+        self._positions = None
+        # Day number <-> 'YYYY-MM-DD' caches; signup dates repeat heavily
+        self._day_numbers = {}
+        self._day_strings = {}
+
+    def _parse_created_at(self, value):
+        """Epoch seconds for canonical 'YYYY-MM-DDTHH:MM:SSZ' strings, else None"""
+        if type(value) is not str or len(value) != 20 or value[10] != 'T' or value[19] != 'Z' \
+                or value[13] != ':' or value[16] != ':':
+            return None
+        day_string = value[:10]
+        day = self._day_numbers.get(day_string)
+        if day is None:
+            try:
+                parsed = datetime.strptime(day_string, '%Y-%m-%d')
+            except ValueError:
+                return None
+            if parsed.strftime('%Y-%m-%d') != day_string:
+                return None
+            day = self._day_numbers[day_string] = calendar.timegm(parsed.timetuple()) // 86400
+            self._day_strings[day] = day_string
+        hours, minutes, seconds = value[11:13], value[14:16], value[17:19]
+        if not (hours.isdigit() and minutes.isdigit() and seconds.isdigit()):
+            return None
+        hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+        if hours > 23 or minutes > 59 or seconds > 59:
+            return None
+        return day * 86400 + hours * 3600 + minutes * 60 + seconds
+
+    @classmethod
+    def from_dicts(cls, users):
+        columns = cls()
+        for user in users:
+            columns.append(user)
+        return columns
+
+    def append(self, user):
+        row = len(self.names)
+        user_id = user.get('id')
+        name, email = user.get('name'), user.get('email')
+        created = self._parse_created_at(user.get('created_at'))
+        int_id = type(user_id) is int and INT64_MIN <= user_id <= INT64_MAX
+        # With all four fields present and typed, len() == 4 rules out extra keys
+        regular = (
+            int_id and type(name) is str and type(email) is str
+            and created is not None and len(user) == 4
+        )
+
+        ids = self.ids
+        if self._sorted and row and not (int_id and type(ids[-1]) is int and ids[-1] < user_id):
+            self._sorted = False
+        # Fall back to a plain list if an id doesn't fit a 64-bit int
+        if not int_id and type(ids) is array:
+            ids = self.ids = list(ids)
+        ids.append(user_id)
+
+        if not regular:
+            self._irregular[row] = dict(user)
+            self.names.append(None)
+            self.email_locals.append(None)
+            self.email_domains.append(0)
+            self.created.append(0)
+            return
+
+        self.names.append(self._names.setdefault(name, name))
+        local, at, domain = email.rpartition('@')
+        if at:
+            index = self._domain_index.get(domain)
+            if index is None:
+                index = self._domain_index[domain] = len(self._domains)
+                self._domains.append(domain)
+            self.email_locals.append(local)
+            self.email_domains.append(index)
+        else:
+            self.email_locals.append(email)
+            self.email_domains.append(0)
+        self.created.append(created)
+
+    def __len__(self):
+        return len(self.names)
+
+    def created_at(self, row):
+        """created_at back in its original 'YYYY-MM-DDTHH:MM:SSZ' form"""
+        day, seconds = divmod(self.created[row], 86400)
+        day_string = self._day_strings.get(day)
+        if day_string is None:
+            day_string = self._day_strings[day] = time.strftime('%Y-%m-%d', time.gmtime(day * 86400))
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        return f"{day_string}T{hours:02d}:{minutes:02d}:{seconds:02d}Z"
+
+    def email(self, row):
+        domain = self._domains[self.email_domains[row]]
+        return self.email_locals[row] if domain is None else f"{self.email_locals[row]}@{domain}"
+
+    def row(self, row):
+        """Materialise one record as a dict"""
+        irregular = self._irregular.get(row)
+        if irregular is not None:
+            return dict(irregular)
+        return {
+            'id': self.ids[row],
+            'name': self.names[row],
+            'email': self.email(row),
+            'created_at': self.created_at(row)
+        }
+
+    def row_key(self, row):
+        """Cheap comparable identity of a record's contents (no dict needed)"""
+        irregular = self._irregular.get(row)
+        if irregular is not None:
+            return (irregular,)
+        return (self.ids[row], self.names[row], self.email_locals[row],
+                self._domains[self.email_domains[row]], self.created[row])
+
+    def iter_dicts(self):
+        for row in range(len(self)):
+            yield self.row(row)
+
+    def index_of(self, user_id):
+        """Row of a user id, or None (bisect when ids are ascending, else a lazy map)"""
+        if not usable_id(user_id):
+            return None
+        if self._sorted:
+            if type(user_id) is not int:
+                return None
+            row = bisect_left(self.ids, user_id)
+            return row if row < len(self.ids) and self.ids[row] == user_id else None
+        if self._positions is None:
+            self._positions = {user_id: row for row, user_id in enumerate(self.ids) if usable_id(user_id)}
+        return self._positions.get(user_id)
+
+    def get(self, user_id):
+        row = self.index_of(user_id)
+        return None if row is None else self.row(row)
+
+    def nbytes(self):
+        """Approximate memory held by the columns (interned strings counted once)"""
+        size = sum(
+            sys.getsizeof(column) for column in
+            (self.ids, self.names, self.email_locals, self.email_domains, self.created,
+             self._domains, self._domain_index, self._names, self._irregular)
+        )
+        if type(self.ids) is list:
+            size += sum(map(sys.getsizeof, self.ids))
+        size += sum(map(sys.getsizeof, self._names))
+        size += sum(map(sys.getsizeof, filter(None, self.email_locals)))
+        size += sum(sys.getsizeof(domain) for domain in self._domains if domain is not None)
+        size += sum(approx_size(row) for row in self._irregular.values())
+        return size
+
+def approx_size(obj):
+    """Rough deep size of parsed JSON, deferring to UserColumns.nbytes()"""
+    if isinstance(obj, UserColumns):
+        return obj.nbytes()
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(key) + approx_size(value) for key, value in obj.items())
+    elif isinstance(obj, list):
+        size += sum(map(approx_size, obj))
+    return size
+
+def diff_users(old, new):
+    """Records added, updated (old, new) and removed between two column sets
+
+    Records without a usable id can't be matched up, so they are compared by
+    content: only ones that appear or disappear are reported, as added or removed.
+    """
+    added, updated = [], []
+    unkeyed = [(old.row_key(row), row) for row in range(len(old)) if not usable_id(old.ids[row])]
+    for row in range(len(new)):
+        user_id = new.ids[row]
+        if not usable_id(user_id):
+            key = new.row_key(row)
+            match = next((i for i, (old_key, _) in enumerate(unkeyed) if old_key == key), None)
+            if match is None:
+                added.append(new.row(row))
+            else:
+                del unkeyed[match]
+            continue
+        old_row = old.index_of(user_id)
+        if old_row is None:
+            added.append(new.row(row))
+        elif old.row_key(old_row) != new.row_key(row):
+            updated.append((old.row(old_row), new.row(row)))
+    removed = [
+        old.row(row) for row in range(len(old))
+        if usable_id(old.ids[row]) and new.index_of(old.ids[row]) is None
+    ]
+    removed.extend(old.row(row) for _, row in unkeyed)
+    return added, updated, removed
+
+class RecordsJSONProvider(DefaultJSONProvider):
+    """JSON provider that serialises UserColumns as a list of user objects"""
+    @staticmethod
+    def default(o):
+        if isinstance(o, UserColumns):
+            return list(o.iter_dicts())
+        return DefaultJSONProvider.default(o)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Declarative full-response cache for Flask views
+
+    @response_cache.cached(ttl=5, vary=('Accept-Encoding',), query=('page',))
+    def view():
+        ...
+
+Responses are keyed by path, the query parameters the view declares it reads
+and the listed request headers. Each worker keeps an LRU bounded by entry
+count and total bytes; with a shared directory configured
+(e.g. on /dev/shm) workers also publish entries for each other. Only one
+recompute per key runs at a time, across threads and (via flock) across workers.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: cross-worker locking is skipped
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Response headers that must not be replayed to other clients
+UNCACHEABLE_HEADERS = ('Set-Cookie', 'Server-Timing', 'X-Cache')
+
+class CacheEntry:
+    __slots__ = ('route', 'status', 'headers', 'body', 'expires_at')
+
+    def __init__(self, route, status, headers, body, expires_at):
+        self.route = route
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    def fresh(self):
+        return self.expires_at > time.time()
+
+    def to_response(self, cache_status):
+        response = Response(self.body, status=self.status, headers=self.headers)
+        response.headers['X-Cache'] = cache_status
+        return response
+
+class LocalLRU:
+    """Per-worker LRU of cache entries, bounded by count and total body bytes"""
+    def __init__(self, max_entries, max_bytes, max_entry_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not entry.fresh():
+                del self._entries[key]
+                self.bytes -= len(entry.body)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        """Store an entry; returns the entries evicted to make room"""
+        if len(entry.body) > self.max_entry_bytes:
+            return []
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous.body)
+            self._entries[key] = entry
+            self.bytes += len(entry.body)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                old = self._entries.popitem(last=False)[1]
+                self.bytes -= len(old.body)
+                evicted.append(old)
+        return evicted
+
+class SharedStore:
+    """Cache entries as files in a directory shared by all workers"""
+    def __init__(self, directory, max_entries, max_entry_bytes):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix='.entry'):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + suffix)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        entry = CacheEntry(header['route'], header['status'], header['headers'], body, header['expires_at'])
+        if not entry.fresh():
+            return None
+        # Touch so eviction treats the shared store as LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry):
+        """Publish an entry; returns the entries evicted to make room"""
+        if len(entry.body) > self.max_entry_bytes:
+            return []
+        header = {'route': entry.route, 'status': entry.status, 'headers': entry.headers, 'expires_at': entry.expires_at}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(header).encode() + b'\n')
+                f.write(entry.body)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            # e.g. ENOSPC on a small /dev/shm: don't leave the partial file behind
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.entry'):
+                try:
+                    entries.append((os.stat(os.path.join(self.directory, name)).st_mtime, name))
+                except OSError:
+                    continue
+        evicted = []
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, name in entries[:len(entries) - self.max_entries]:
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path, 'rb') as f:
+                        route = json.loads(f.readline()).get('route', 'unknown')
+                    os.unlink(path)
+                except (OSError, ValueError):
+                    continue
+                evicted.append(CacheEntry(route, 0, [], b'', 0))
+                try:
+                    os.unlink(path[:-len('.entry')] + '.lock')
+                except OSError:
+                    pass
+        return evicted
+
+    def lock(self, key):
+        """Exclusive cross-worker lock for recomputing one key"""
+        return _FileLock(self._path(key, '.lock'))
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+class ResponseCache:
+    def __init__(self, requests_counter, evictions_counter, max_entries=256, max_bytes=64 * 1024 * 1024,
+                 shared_dir=None, max_entry_bytes=8 * 1024 * 1024, enabled=True):
+        self.enabled = enabled
+        self.local = LocalLRU(max_entries, max_bytes, max_entry_bytes)
+        self.shared = SharedStore(shared_dir, max_entries, max_entry_bytes) if shared_dir else None
+        self._requests = requests_counter
+        self._evictions = evictions_counter
+        # Striped locks bound the per-key lock table
+        self._key_locks = [threading.Lock() for _ in range(64)]
+
+    def _key(self, vary, params):
+        # Only parameters the view reads, so unrelated ones can't bust the cache
+        query = '&'.join(f"{name}={value}" for name in sorted(params) for value in request.args.getlist(name))
+        headers = '|'.join(f"{name}={request.headers.get(name, '')}" for name in vary)
+        return f"{request.method} {request.path}?{query}|{headers}"
+
+    def _lookup(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self._count_evictions(self.local.set(key, entry), 'local')
+        return entry
+
+    def _count_evictions(self, evicted, tier):
+        for entry in evicted:
+            self._evictions.labels(route=entry.route, tier=tier).inc()
+
+    def _store(self, key, entry):
+        self._count_evictions(self.local.set(key, entry), 'local')
+        if self.shared is not None:
+            try:
+                self._count_evictions(self.shared.set(key, entry), 'shared')
+            except OSError as e:
+                logger.warning(f"Shared response cache write failed: {str(e)}")
+
+    def cached(self, ttl, vary=(), query=()):
+        """Cache a view's full response for ttl seconds, keyed on the query parameters it reads"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD'):
+                    return func(*args, **kwargs)
+
+                route = request.endpoint or func.__name__
+                key = self._key(vary, query)
+                entry = self._lookup(key)
+                if entry is not None:
+                    self._requests.labels(route=route, result='hit').inc()
+                    return entry.to_response('HIT')
+
+                # Single recompute per key: later arrivals wait, then re-check
+                key_lock = self._key_locks[hash(key) % len(self._key_locks)]
+                with key_lock, (self.shared.lock(key) if self.shared else _NullLock()):
+                    entry = self._lookup(key)
+                    if entry is not None:
+                        self._requests.labels(route=route, result='hit').inc()
+                        return entry.to_response('HIT')
+
+                    self._requests.labels(route=route, result='miss').inc()
+                    response = make_response(func(*args, **kwargs))
+                    if response.status_code == 200 and not response.is_streamed:
+                        headers = [(k, v) for k, v in response.headers.items() if k not in UNCACHEABLE_HEADERS]
+                        self._store(key, CacheEntry(route, response.status_code, headers,
+                                                    response.get_data(), time.time() + ttl))
+                    response.headers['X-Cache'] = 'MISS'
+                    return response
+            return wrapper
+        return decorator
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Python runtime metrics for each worker process
+GC pauses are timed through gc.callbacks; memory and thread figures are read
+at scrape time, so nothing runs on the request path.
+"""
+
+import gc
+import os
+import sys
+import time
+import resource
+import threading
+
+from prometheus_client.core import GaugeMetricFamily
+
+GC_PAUSE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss_bytes():
+    """Resident set size from /proc, falling back to peak RSS elsewhere"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class GCTimer:
+    """gc.callbacks hook observing pause time and collected objects per generation"""
+    def __init__(self, pause_histogram, collected_counter):
+        self._pause = {gen: pause_histogram.labels(generation=str(gen)) for gen in range(3)}
+        self._collected = {gen: collected_counter.labels(generation=str(gen)) for gen in range(3)}
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            generation = info['generation']
+            self._pause[generation].observe(time.perf_counter() - self._start)
+            self._collected[generation].inc(info['collected'])
+            self._start = None
+
+class RuntimeCollector:
+    """Scrape-time gauges: RSS, thread count and allocated blocks of this worker"""
+    def __init__(self):
+        self._baseline_blocks = sys.getallocatedblocks()
+
+    def collect(self):
+        pid = str(os.getpid())
+
+        rss = GaugeMetricFamily('python_worker_rss_bytes', 'Resident memory of this worker', labels=['pid'])
+        rss.add_metric([pid], current_rss_bytes())
+        yield rss
+
+        threads = GaugeMetricFamily('python_worker_threads', 'Live threads in this worker', labels=['pid'])
+        threads.add_metric([pid], threading.active_count())
+        yield threads
+
+        blocks = sys.getallocatedblocks()
+        yield GaugeMetricFamily('python_allocated_blocks', 'Memory blocks currently allocated by the interpreter', value=blocks)
+        yield GaugeMetricFamily(
+            'python_allocated_blocks_growth', 'Allocated blocks gained since the worker started',
+            value=blocks - self._baseline_blocks
+        )
+
+def install_runtime_metrics(registry, pause_histogram, collected_counter):
+    """Hook the GC timer and register the scrape-time collector (once per process)"""
+    if not any(isinstance(callback, GCTimer) for callback in gc.callbacks):
+        gc.callbacks.append(GCTimer(pause_histogram, collected_counter))
+    registry.register(RuntimeCollector())
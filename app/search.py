@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+In-memory search index over user names and emails
+An inverted index maps each lowercase token to the ids containing it, and a
+sorted list of tokens answers prefix (autocomplete) lookups with bisect.
+Postings for tokens held by a single user are stored as a bare int, which is
+most tokens in practice and saves a set per token.
+"""
+
+import re
+import threading
+from bisect import bisect_left
+
+from records import usable_id
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+def user_tokens(user):
+    return set(tokenize(user.get('name'))) | set(tokenize(user.get('email')))
+
+class UserIndex:
+    def __init__(self):
+        self.postings = {}
+        self._terms = []
+        self._terms_dirty = False
+        self._lock = threading.RLock()
+
+    def _add_posting(self, term, user_id):
+        ids = self.postings.get(term)
+        if ids is None:
+            self.postings[term] = user_id
+            self._terms_dirty = True
+        elif isinstance(ids, set):
+            ids.add(user_id)
+        elif ids != user_id:
+            self.postings[term] = {ids, user_id}
+
+    def _remove_posting(self, term, user_id):
+        ids = self.postings.get(term)
+        if isinstance(ids, set):
+            ids.discard(user_id)
+            if len(ids) == 1:
+                self.postings[term] = next(iter(ids))
+        elif ids == user_id:
+            del self.postings[term]
+            self._terms_dirty = True
+
+    def _index(self, user):
+        # Users without a usable id couldn't be fetched back from a hit
+        user_id = user.get('id')
+        if usable_id(user_id):
+            for term in user_tokens(user):
+                self._add_posting(term, user_id)
+
+    def _unindex(self, user):
+        user_id = user.get('id')
+        if usable_id(user_id):
+            for term in user_tokens(user):
+                self._remove_posting(term, user_id)
+
+    def reset(self, users):
+        with self._lock:
+            self.postings = {}
+            for user in users:
+                self._index(user)
+            self._terms = sorted(self.postings)
+            self._terms_dirty = False
+
+    def apply(self, added, updated, removed):
+        with self._lock:
+            for user in removed:
+                self._unindex(user)
+            for old, new in updated:
+                self._unindex(old)
+                self._index(new)
+            for user in added:
+                self._index(user)
+
+    def _ids(self, term):
+        ids = self.postings.get(term)
+        if ids is None:
+            return set()
+        return ids if isinstance(ids, set) else {ids}
+
+    def _prefix_terms(self, prefix):
+        if self._terms_dirty:
+            self._terms = sorted(self.postings)
+            self._terms_dirty = False
+        i = bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            yield self._terms[i]
+            i += 1
+
+    def search(self, query, limit=10):
+        """Ids of users matching every complete word of query, with the last word as a prefix
+
+        Returns (user_ids, truncated); truncated is True if more users matched.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], False
+
+        with self._lock:
+            *complete, prefix = tokens
+            candidates = None
+            for term in complete:
+                ids = self._ids(term)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return [], False
+
+            matched = []
+            seen = set()
+            for term in self._prefix_terms(prefix):
+                for user_id in self._matching(self._ids(term), candidates):
+                    if user_id in seen:
+                        continue
+                    if len(matched) == limit:
+                        return matched, True
+                    seen.add(user_id)
+                    matched.append(user_id)
+            return matched, False
+
+    @staticmethod
+    def _matching(ids, candidates):
+        """Lazily yield ids also in candidates, walking the smaller set"""
+        if candidates is None:
+            yield from ids
+        elif len(candidates) < len(ids):
+            yield from (user_id for user_id in candidates if user_id in ids)
+        else:
+            yield from (user_id for user_id in ids if user_id in candidates)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Single-flight call coalescing
+Concurrent callers asking for the same key share one execution instead of
+each doing the work: the first caller runs it, the rest wait for its result.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run fn, or wait for the call already running for key; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            self._run(key, call, fn)
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
+
+    def do_async(self, key, fn):
+        """Start fn on a background thread unless key is already in flight; True if started"""
+        with self._lock:
+            if key in self._calls:
+                return False
+            call = self._calls[key] = _Call()
+        threading.Thread(target=self._run, args=(key, call, fn), name=f'singleflight-{key}', daemon=True).start()
+        return True
+
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            logger.debug(f"Single-flight call {key} failed: {str(e)}")
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Opt-in capture of request metadata for load replay
+Sampled requests are appended to a JSON Lines file (one object per request)
+which benchmarks/replay.py re-issues against another instance.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+CAPTURED_HEADERS = ('Accept', 'Accept-Encoding', 'Accept-Language', 'User-Agent', 'If-None-Match', 'Content-Type')
+# Debug endpoints are never captured (requests to them carry access tokens)
+SKIPPED_PREFIXES = ('/debug/',)
+# Nor is the dashboard's endless status stream, which a replay could never finish
+SKIPPED_ENDPOINTS = ('status_stream',)
+
+class TrafficCapture:
+    def __init__(self, path, sample_rate, headers=CAPTURED_HEADERS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.headers = headers
+        self._lock = threading.Lock()
+        self._last_arrival = None
+        # O_APPEND keeps single-line writes from several workers from interleaving
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def before_request(self):
+        if random.random() >= self.sample_rate or request.path.startswith(SKIPPED_PREFIXES):
+            return
+        if request.endpoint in SKIPPED_ENDPOINTS:
+            return
+        now = time.time()
+        with self._lock:
+            inter_arrival = 0.0 if self._last_arrival is None else now - self._last_arrival
+            self._last_arrival = now
+        record = {
+            'ts': now,
+            'inter_arrival': round(inter_arrival, 6),
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('latin-1'),
+            'headers': {name: request.headers[name] for name in self.headers if name in request.headers}
+        }
+        try:
+            os.write(self._fd, (json.dumps(record, separators=(',', ':')) + '\n').encode())
+        except OSError as e:
+            logger.warning(f"Traffic capture write failed: {str(e)}")
+
+def init_traffic_capture(app):
+    """Set up capture from TRAFFIC_CAPTURE* settings; returns None when disabled"""
+    if os.getenv('TRAFFIC_CAPTURE', 'false').lower() != 'true':
+        return None
+    capture = TrafficCapture(
+        path=os.getenv('TRAFFIC_CAPTURE_FILE', 'requests.jsonl'),
+        sample_rate=float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0))
+    )
+    app.before_request(capture.before_request)
+    logger.info(f"Capturing {capture.sample_rate:.0%} of requests to {capture.path}")
+    return capture
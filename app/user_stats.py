@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Materialised aggregates over the users collection
+Built once from the full list, then maintained from record-level changes,
+so serving them never requires a scan of the users.
+"""
+
+import threading
+from collections import Counter
+from datetime import datetime
+
+def signup_day(user):
+    """Calendar day (YYYY-MM-DD) of a user's created_at, or 'unknown'"""
+    created_at = user.get('created_at') or ''
+    try:
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00')).date().isoformat()
+    except ValueError:
+        return 'unknown'
+
+def email_domain(user):
+    email = user.get('email') or ''
+    return email.rpartition('@')[2].lower() if '@' in email else 'unknown'
+
+class UserStats:
+    def __init__(self):
+        self.total_users = 0
+        self.signups_per_day = Counter()
+        self.email_domains = Counter()
+        self._lock = threading.Lock()
+
+    def _add(self, user, sign):
+        self.total_users += sign
+        for counter, key in ((self.signups_per_day, signup_day(user)), (self.email_domains, email_domain(user))):
+            counter[key] += sign
+            if counter[key] <= 0:
+                del counter[key]
+
+    def reset(self, users):
+        with self._lock:
+            self.total_users = 0
+            self.signups_per_day.clear()
+            self.email_domains.clear()
+            for user in users:
+                self._add(user, 1)
+
+    def apply(self, added, updated, removed):
+        with self._lock:
+            for user in added:
+                self._add(user, 1)
+            for old, new in updated:
+                self._add(old, -1)
+                self._add(new, 1)
+            for user in removed:
+                self._add(user, -1)
+
+    def snapshot(self, top_domains=20):
+        with self._lock:
+            return {
+                'total_users': self.total_users,
+                'signups_per_day': dict(sorted(self.signups_per_day.items())),
+                'email_domains': dict(self.email_domains.most_common(top_domains)),
+                'distinct_email_domains': len(self.email_domains)
+            }
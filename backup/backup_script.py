@@ -6,12 +6,22 @@ Simulates database backups by copying data.json with timestamps
 
 import os
 import json
+import stat
 import shutil
+import hashlib
+import tempfile
 import schedule
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, start_http_server, write_to_textfile
+)
+from remote import S3Target, UPLOAD_STATE_SUFFIX
+from throttle import TokenBucket
+from json_check import JsonValidator
 
 # Configure logging with flexible path
 backup_log_path = os.getenv('BACKUP_LOG_PATH', './backup/backup.log')
@@ -27,8 +37,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Read/write size used when streaming backups
+CHUNK_SIZE = 1024 * 1024
+CHECKSUM_SUFFIX = '.sha256'
+# Backups that fail a scrub are moved here, out of reach of the retention glob
+QUARANTINE_DIR = 'quarantine'
+SCRUB_REPORT = 'scrub_report.json'
+
+# Prometheus metrics - kept in their own registry so the exporter and the
+# textfile output only carry backup series
+BACKUP_REGISTRY = CollectorRegistry()
+BACKUP_DURATION = Histogram(
+    'backup_operation_duration_seconds', 'Backup operation duration', ['operation'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+    registry=BACKUP_REGISTRY
+)
+BACKUP_SIZE = Histogram(
+    'backup_size_bytes', 'Size of created backup files',
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10),
+    registry=BACKUP_REGISTRY
+)
+BACKUP_LAST_SIZE = Gauge('backup_last_size_bytes', 'Size of the most recent backup', registry=BACKUP_REGISTRY)
+BACKUP_THROUGHPUT = Gauge(
+    'backup_last_throughput_bytes_per_second', 'Throughput of the most recent operation', ['operation'],
+    registry=BACKUP_REGISTRY
+)
+BACKUP_LAST_SUCCESS = Gauge(
+    'backup_last_success_timestamp_seconds', 'Unix time of the last successful operation', ['operation'],
+    registry=BACKUP_REGISTRY
+)
+BACKUP_FAILURES = Counter('backup_failures_total', 'Failed backup operations', ['operation'], registry=BACKUP_REGISTRY)
+BACKUP_FILES = Gauge('backup_files', 'Backup files currently retained', registry=BACKUP_REGISTRY)
+BACKUP_REMOVED = Counter('backup_cleanup_removed_total', 'Backups removed by retention cleanup', registry=BACKUP_REGISTRY)
+BACKUP_SCRUB_RESULTS = Gauge(
+    'backup_scrub_files', 'Backups by result of the most recent scrub', ['result'],
+    registry=BACKUP_REGISTRY
+)
+BACKUP_QUARANTINED = Counter('backup_quarantined_total', 'Backups moved to quarantine by scrub', registry=BACKUP_REGISTRY)
+
+def record_success(operation, start_time, size=None):
+    """Record the success gauges for a finished operation"""
+    BACKUP_LAST_SUCCESS.labels(operation=operation).set_to_current_time()
+    if size is not None:
+        elapsed = time.time() - start_time
+        if elapsed > 0:
+            BACKUP_THROUGHPUT.labels(operation=operation).set(size / elapsed)
+
+def write_metrics_textfile(path=None):
+    """Write backup metrics for the node_exporter textfile collector"""
+    if path is None:
+        path = os.getenv('BACKUP_METRICS_TEXTFILE', os.path.join(os.getenv('BACKUP_DIR', './backup'), 'backup_metrics.prom'))
+    try:
+        write_to_textfile(path, BACKUP_REGISTRY)
+    except OSError as e:
+        logger.warning(f"Could not write metrics textfile {path}: {str(e)}")
+
 class BackupManager:
-    def __init__(self, source_file=None, backup_dir=None):
+    def __init__(self, source_file=None, backup_dir=None, remote=None):
         # Use environment variables or defaults for flexible deployment
         if source_file is None:
             source_file = os.getenv('SOURCE_FILE', './data/data.json')
@@ -37,33 +102,67 @@ class BackupManager:
         self.source_file = Path(source_file)
         self.backup_dir = Path(backup_dir)
         self.backup_dir.mkdir(exist_ok=True)
+        # Offsite copy target, configured through the BACKUP_S3_* settings
+        self.remote = remote if remote is not None else S3Target.from_env()
         
     def create_backup(self):
         """Create a timestamped backup of the data file"""
+        start_time = time.time()
         try:
             if not self.source_file.exists():
                 logger.warning(f"Source file {self.source_file} does not exist")
+                BACKUP_FAILURES.labels(operation='create').inc()
                 return False
                 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_filename = f"data_backup_{timestamp}.json"
             backup_path = self.backup_dir / backup_filename
             
-            # Copy the file
-            shutil.copy2(self.source_file, backup_path)
+            # Copy the file and add backup metadata
+            checksum = self._write_backup(backup_path, timestamp)
             
-            # Add backup metadata
-            self._add_backup_metadata(backup_path, timestamp)
+            size = backup_path.stat().st_size
+            BACKUP_SIZE.observe(size)
+            BACKUP_LAST_SIZE.set(size)
+            record_success('create', start_time, size)
             
             # Clean old backups (keep last 10)
             self._cleanup_old_backups()
             
+            # Ship a copy off the data volume
+            self.upload_backup(backup_path, checksum)
+            
             logger.info(f"Backup created successfully: {backup_filename}")
             return True
             
         except Exception as e:
             logger.error(f"Backup failed: {str(e)}")
+            BACKUP_FAILURES.labels(operation='create').inc()
             return False
+        finally:
+            BACKUP_DURATION.labels(operation='create').observe(time.time() - start_time)
+    
+    def _write_backup(self, backup_path, timestamp=None):
+        """Copy the data file to backup_path, returning its checksum
+        
+        The copy is built under a hidden temp name and renamed into place only
+        after its checksum file exists, so list and scrub never see a partial
+        backup. With a timestamp, backup metadata is added to the copy.
+        """
+        tmp_path = backup_path.with_name(f".{backup_path.name}.tmp")
+        try:
+            shutil.copy2(self.source_file, tmp_path)
+            if timestamp is not None:
+                self._add_backup_metadata(tmp_path, timestamp)
+            checksum = self._write_checksum(backup_path, tmp_path)
+            os.replace(tmp_path, backup_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            if not backup_path.exists():
+                self._checksum_path(backup_path).unlink(missing_ok=True)
+            raise
+        self._fsync_dir(self.backup_dir)
+        return checksum
     
     def _add_backup_metadata(self, backup_path, timestamp):
         """Add metadata to the backup file"""
@@ -90,22 +189,58 @@ class BackupManager:
     
     def _cleanup_old_backups(self, keep_count=10):
         """Remove old backup files, keeping only the most recent ones"""
+        start_time = time.time()
         try:
             backup_files = list(self.backup_dir.glob("data_backup_*.json"))
             backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
             
             if len(backup_files) > keep_count:
                 for old_backup in backup_files[keep_count:]:
-                    old_backup.unlink()
+                    for path in self._backup_files(old_backup):
+                        path.unlink(missing_ok=True)
+                    BACKUP_REMOVED.inc()
                     logger.info(f"Removed old backup: {old_backup.name}")
+            
+            BACKUP_FILES.set(min(len(backup_files), keep_count))
+            record_success('cleanup', start_time)
                     
         except Exception as e:
             logger.error(f"Cleanup failed: {str(e)}")
+            BACKUP_FAILURES.labels(operation='cleanup').inc()
+        finally:
+            BACKUP_DURATION.labels(operation='cleanup').observe(time.time() - start_time)
+    
+    def upload_backup(self, backup_path, checksum=None):
+        """Copy a backup to the offsite target, if one is configured"""
+        if self.remote is None:
+            return True
+        start_time = time.time()
+        try:
+            if checksum is None:
+                checksum = self._read_checksum(backup_path) or self._write_checksum(backup_path)
+            uploaded = self.remote.upload(backup_path, checksum)
+            record_success('upload', start_time, backup_path.stat().st_size if uploaded else None)
+            return True
+        except Exception as e:
+            logger.error(f"Offsite upload failed for {backup_path.name}: {str(e)}")
+            BACKUP_FAILURES.labels(operation='upload').inc()
+            return False
+        finally:
+            BACKUP_DURATION.labels(operation='upload').observe(time.time() - start_time)
+    
+    def upload_all(self):
+        """Upload every local backup that is missing offsite (resumes partial uploads)"""
+        if self.remote is None:
+            logger.error("No offsite target configured (set BACKUP_S3_BUCKET)")
+            return False
+        results = [self.upload_backup(backup_file) for backup_file in self.list_backups()]
+        return all(results)
     
     def list_backups(self):
         """List all available backups"""
         backup_files = list(self.backup_dir.glob("data_backup_*.json"))
         backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        BACKUP_FILES.set(len(backup_files))
         
         logger.info(f"Found {len(backup_files)} backup files:")
         for backup_file in backup_files:
@@ -115,39 +250,246 @@ class BackupManager:
             
         return backup_files
     
-    def restore_backup(self, backup_filename):
-        """Restore from a specific backup file"""
+    def scrub(self, max_workers=None, bytes_per_second=None):
+        """Verify every backup's checksum and JSON, quarantining corrupt ones
+        
+        Backups are read concurrently by max_workers threads that share one
+        bytes_per_second throttle, so a scrub doesn't starve the app of disk.
+        Each file is hashed and validated as it streams past, so memory stays
+        bounded by the chunk size rather than the backup size.
+        Returns True if nothing was corrupt or unreadable.
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv('BACKUP_SCRUB_WORKERS', 2))
+        if bytes_per_second is None:
+            bytes_per_second = float(os.getenv('BACKUP_SCRUB_MB_PER_SEC', 50)) * 1024 * 1024
+        start_time = time.time()
+        try:
+            backups = sorted(self.backup_dir.glob("data_backup_*.json")) + sorted(self.backup_dir.glob("pre_restore_backup_*.json"))
+            throttle = TokenBucket(bytes_per_second, burst=max(bytes_per_second, CHUNK_SIZE))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='scrub') as pool:
+                results = list(pool.map(lambda path: self._scrub_one(path, throttle), backups))
+            
+            counts = {result: 0 for result in ('ok', 'unverified', 'corrupt', 'error')}
+            for result in results:
+                counts[result['result']] += 1
+                if result['result'] == 'corrupt':
+                    self._quarantine(Path(result['path']))
+            for result, count in counts.items():
+                BACKUP_SCRUB_RESULTS.labels(result=result).set(count)
+            
+            scanned = sum(result['bytes'] for result in results)
+            duration = time.time() - start_time
+            report = {
+                'finished_at': datetime.now().isoformat(),
+                'duration_seconds': round(duration, 3),
+                'bytes_scanned': scanned,
+                'counts': counts,
+                'backups': results
+            }
+            with open(self.backup_dir / SCRUB_REPORT, 'w') as f:
+                json.dump(report, f, indent=2)
+            
+            ok = counts['corrupt'] == 0 and counts['error'] == 0
+            if ok:
+                record_success('scrub', start_time, scanned)
+            else:
+                BACKUP_FAILURES.labels(operation='scrub').inc()
+            logger.info(f"Scrub finished in {duration:.1f}s: {counts['ok']} ok, {counts['unverified']} without checksum, "
+                        f"{counts['corrupt']} corrupt, {counts['error']} unreadable ({scanned} bytes)")
+            return ok
+            
+        except Exception as e:
+            logger.error(f"Scrub failed: {str(e)}")
+            BACKUP_FAILURES.labels(operation='scrub').inc()
+            return False
+        finally:
+            BACKUP_DURATION.labels(operation='scrub').observe(time.time() - start_time)
+    
+    def _scrub_one(self, backup_path, throttle):
+        """Checksum and validate one backup in a single streaming pass, reading at most the throttle allows"""
+        result = {'path': str(backup_path), 'name': backup_path.name, 'bytes': 0}
+        try:
+            expected_checksum = self._read_checksum(backup_path)
+            digest = hashlib.sha256()
+            validator = JsonValidator()
+            with open(backup_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    throttle.consume(len(chunk))
+                    digest.update(chunk)
+                    result['bytes'] += len(chunk)
+                    validator.feed(chunk)
+            validator.close()
+        except OSError as e:
+            logger.error(f"Scrub could not read {backup_path.name}: {str(e)}")
+            return {**result, 'result': 'error', 'error': str(e)}
+        except ValueError as e:
+            logger.error(f"Scrub: {backup_path.name} is not valid JSON: {str(e)}")
+            return {**result, 'result': 'corrupt', 'error': f"invalid JSON: {str(e)}"}
+        
+        checksum = digest.hexdigest()
+        if expected_checksum is not None and checksum != expected_checksum:
+            logger.error(f"Scrub: checksum mismatch for {backup_path.name}")
+            return {**result, 'result': 'corrupt', 'error': f"checksum mismatch: expected {expected_checksum}, got {checksum}"}
+        return {**result, 'result': 'ok' if expected_checksum is not None else 'unverified'}
+    
+    def _quarantine(self, backup_path):
+        """Move a corrupt backup and its sidecar files into the quarantine directory"""
+        quarantine = self.backup_dir / QUARANTINE_DIR
+        quarantine.mkdir(exist_ok=True)
+        for path in self._backup_files(backup_path):
+            if path.exists():
+                os.replace(path, quarantine / path.name)
+        BACKUP_QUARANTINED.inc()
+        logger.warning(f"Quarantined corrupt backup {backup_path.name} in {quarantine}")
+    
+    def _backup_files(self, backup_path):
+        """A backup and the sidecar files that belong to it"""
+        return [backup_path, self._checksum_path(backup_path), backup_path.with_name(backup_path.name + UPLOAD_STATE_SUFFIX)]
+    
+    def _checksum_path(self, backup_path):
+        """Path of the checksum file stored next to a backup"""
+        return backup_path.with_name(backup_path.name + CHECKSUM_SUFFIX)
+    
+    def _file_checksum(self, path):
+        """SHA-256 of a file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _write_checksum(self, backup_path, data_path=None):
+        """Record the checksum of a finished backup file (read from data_path if not yet in place)"""
+        checksum = self._file_checksum(data_path or backup_path)
+        self._checksum_path(backup_path).write_text(f"{checksum}  {backup_path.name}\n")
+        return checksum
+    
+    def _read_checksum(self, backup_path):
+        """Recorded checksum of a backup, or None for backups made without one"""
+        checksum_path = self._checksum_path(backup_path)
+        if not checksum_path.exists():
+            return None
+        return checksum_path.read_text().split()[0]
+    
+    def _stream_to_temp(self, backup_path):
+        """Copy a backup into a temp file next to the target, hashing and validating its JSON as it goes"""
+        target_dir = self.source_file.parent
+        target_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target_dir, prefix=f".{self.source_file.name}.", suffix='.restore')
+        tmp_path = Path(tmp_name)
+        digest = hashlib.sha256()
+        validator = JsonValidator()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as dst, open(backup_path, 'rb') as src:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    validator.feed(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+                validator.close()
+                dst.flush()
+                os.fsync(dst.fileno())
+        except ValueError as e:
+            tmp_path.unlink(missing_ok=True)
+            raise ValueError(f"invalid JSON in {backup_path.name}: {str(e)}") from e
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return tmp_path, digest.hexdigest(), size
+    
+    def _fsync_dir(self, directory):
+        """Persist a rename by syncing its directory (no-op where unsupported)"""
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+    
+    def restore_backup(self, backup_filename, dry_run=False):
+        """Restore from a specific backup file
+        
+        The backup is streamed into a temp file next to the data file, checked as
+        JSON on the way through and against its recorded checksum at the end,
+        then renamed over the data file so readers only ever see the old or the
+        new contents.
+        With dry_run the backup is verified but the data file is left alone.
+        """
+        start_time = time.time()
+        tmp_path = None
         try:
             backup_path = self.backup_dir / backup_filename
             if not backup_path.exists():
                 logger.error(f"Backup file not found: {backup_filename}")
+                BACKUP_FAILURES.labels(operation='restore').inc()
                 return False
             
+            expected_checksum = self._read_checksum(backup_path)
+            if expected_checksum is None:
+                logger.warning(f"No checksum recorded for {backup_filename}, verifying JSON only")
+            
+            tmp_path, checksum, size = self._stream_to_temp(backup_path)
+            if expected_checksum is not None and checksum != expected_checksum:
+                raise ValueError(f"checksum mismatch for {backup_filename}: expected {expected_checksum}, got {checksum}")
+            
+            if dry_run:
+                logger.info(f"Dry run: {backup_filename} verified ({size} bytes), data file unchanged")
+                return True
+            
             # Create a backup of current file before restore
-            current_backup = f"pre_restore_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            shutil.copy2(self.source_file, self.backup_dir / current_backup)
+            if self.source_file.exists():
+                current_backup = self.backup_dir / f"pre_restore_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                self._write_backup(current_backup)
+                mode = stat.S_IMODE(self.source_file.stat().st_mode)
+            else:
+                logger.warning(f"Source file {self.source_file} does not exist, skipping pre-restore backup")
+                mode = 0o644
             
-            # Restore the backup
-            shutil.copy2(backup_path, self.source_file)
+            # Atomically swap in the restored file
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.source_file)
+            tmp_path = None
+            self._fsync_dir(self.source_file.parent)
+            
+            record_success('restore', start_time, size)
             logger.info(f"Restored from backup: {backup_filename}")
             return True
             
         except Exception as e:
             logger.error(f"Restore failed: {str(e)}")
+            BACKUP_FAILURES.labels(operation='restore').inc()
             return False
+        finally:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+            BACKUP_DURATION.labels(operation='restore').observe(time.time() - start_time)
 
 def run_scheduled_backups():
     """Run the backup scheduler"""
     backup_manager = BackupManager()
     
+    # Expose metrics for Prometheus while the scheduler is running
+    metrics_port = int(os.getenv('BACKUP_METRICS_PORT', 9102))
+    start_http_server(metrics_port, registry=BACKUP_REGISTRY)
+    logger.info(f"Backup metrics exporter listening on port {metrics_port}")
+    
     # Schedule backups every 15 minutes
     schedule.every(15).minutes.do(backup_manager.create_backup)
     
     # Also schedule a daily cleanup
     schedule.every().day.at("02:00").do(backup_manager._cleanup_old_backups)
     
+    # And a daily integrity scrub, after cleanup so it skips files about to go
+    schedule.every().day.at("03:00").do(backup_manager.scrub)
+    
     logger.info("Backup scheduler started - running every 15 minutes")
-    logger.info("Daily cleanup scheduled at 02:00")
+    logger.info("Daily cleanup scheduled at 02:00, scrub at 03:00")
     
     # Run initial backup
     backup_manager.create_backup()
@@ -167,21 +509,35 @@ if __name__ == "__main__":
         
         if command == "backup":
             success = backup_manager.create_backup()
+            write_metrics_textfile()
             sys.exit(0 if success else 1)
             
         elif command == "list":
             backup_manager.list_backups()
+            write_metrics_textfile()
             
         elif command == "restore" and len(sys.argv) > 2:
             backup_filename = sys.argv[2]
-            success = backup_manager.restore_backup(backup_filename)
+            dry_run = "--dry-run" in sys.argv[3:]
+            success = backup_manager.restore_backup(backup_filename, dry_run=dry_run)
+            write_metrics_textfile()
+            sys.exit(0 if success else 1)
+            
+        elif command == "upload":
+            success = backup_manager.upload_all()
+            write_metrics_textfile()
+            sys.exit(0 if success else 1)
+            
+        elif command == "scrub":
+            success = backup_manager.scrub()
+            write_metrics_textfile()
             sys.exit(0 if success else 1)
             
         elif command == "schedule":
             run_scheduled_backups()
             
         else:
-            print("Usage: python backup_script.py [backup|list|restore <filename>|schedule]")
+            print("Usage: python backup_script.py [backup|list|restore <filename> [--dry-run]|upload|scrub|schedule]")
             sys.exit(1)
     else:
         # Default: run scheduler
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for the subset of the S3 client API used by remote.S3Target
+Lets offsite uploads be exercised without a network or an object store:
+    S3Target('backups', client=FakeS3Client())
+"""
+
+import hashlib
+import threading
+import uuid
+
+class FakeClientError(Exception):
+    """Mirrors the shape of botocore's ClientError"""
+    def __init__(self, code, operation):
+        super().__init__(f"{code} in {operation}")
+        self.response = {'Error': {'Code': code}}
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, operation):
+        with self._lock:
+            self.calls.append(operation)
+
+    def head_object(self, Bucket, Key):
+        self._record('head_object')
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise FakeClientError('404', 'HeadObject')
+        return {'ContentLength': len(obj['Body']), 'Metadata': dict(obj['Metadata'])}
+
+    def get_object(self, Bucket, Key):
+        self._record('get_object')
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise FakeClientError('NoSuchKey', 'GetObject')
+        return {'Body': obj['Body'], 'Metadata': dict(obj['Metadata'])}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None):
+        self._record('put_object')
+        data = Body.read() if hasattr(Body, 'read') else Body
+        with self._lock:
+            self.objects[(Bucket, Key)] = {'Body': data, 'Metadata': Metadata or {}}
+        return {'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None):
+        self._record('create_multipart_upload')
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {'Bucket': Bucket, 'Key': Key, 'Metadata': Metadata or {}, 'Parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._record('upload_part')
+        upload = self.uploads.get(UploadId)
+        if upload is None:
+            raise FakeClientError('NoSuchUpload', 'UploadPart')
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        with self._lock:
+            upload['Parts'][PartNumber] = (etag, Body)
+        return {'ETag': etag}
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0):
+        self._record('list_parts')
+        upload = self.uploads.get(UploadId)
+        if upload is None:
+            raise FakeClientError('NoSuchUpload', 'ListParts')
+        parts = [
+            {'PartNumber': n, 'ETag': etag, 'Size': len(body)}
+            for n, (etag, body) in sorted(upload['Parts'].items()) if n > PartNumberMarker
+        ]
+        return {'Parts': parts, 'IsTruncated': False}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._record('abort_multipart_upload')
+        with self._lock:
+            if self.uploads.pop(UploadId, None) is None:
+                raise FakeClientError('NoSuchUpload', 'AbortMultipartUpload')
+        return {}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._record('complete_multipart_upload')
+        upload = self.uploads.pop(UploadId, None)
+        if upload is None:
+            raise FakeClientError('NoSuchUpload', 'CompleteMultipartUpload')
+        body = b''.join(upload['Parts'][part['PartNumber']][1] for part in MultipartUpload['Parts'])
+        with self._lock:
+            self.objects[(Bucket, Key)] = {'Body': body, 'Metadata': upload['Metadata']}
+        return {'Key': Key}
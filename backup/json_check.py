@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON syntax check with bounded memory
+JsonValidator is fed a file chunk by chunk and keeps only a small carry-over
+and one entry per open array/object, so multi-GB backups can be validated
+without holding the raw bytes or building the parsed tree. It accepts what
+json.load accepts (including NaN and Infinity) and checks UTF-8 on the way.
+Inside an array or object, the members up to the last complete one in the
+chunk are handed to the C parser in one go, so a list of user records is
+checked at close to json.loads speed. Needs Python 3.11+ for possessive
+quantifiers.
+"""
+
+import re
+import json
+import codecs
+
+WS = r'[ \t\n\r]*'
+STRING = r'"(?:[^"\\\x00-\x1f]++|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*+"'
+TOKEN = re.compile(
+    WS + '(?:'
+    rf'(?P<string>{STRING})'
+    r'|(?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)'
+    r'|(?P<literal>true|false|null|NaN|Infinity|-Infinity)'
+    r'|(?P<punct>[{}\[\]:,])'
+    ')'
+)
+# A string that may still be completed by the next chunk
+STRING_PREFIX = re.compile(r'"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*(?:\\(?:u[0-9a-fA-F]{0,3})?)?')
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Characters that could still extend a number at the end of a chunk
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+# Longest non-string token that can be split across chunks
+MAX_PARTIAL = 64
+# What may follow the last member of a run: another member or the container's end
+AFTER_MEMBER = re.compile(r'[ \t\n\r]*[,\]}]')
+# Runs shorter than this aren't worth a C parse; cut points tried per run
+MIN_RUN = 4096
+RUN_ATTEMPTS = 3
+
+class JsonValidator:
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._pending = ''
+        self._stack = []
+        self._expect = 'value'
+        # Depth -> offset before which runs at that depth aren't retried
+        self._no_runs_before = {}
+        self.offset = 0
+
+    def feed(self, data):
+        """Check the next chunk of bytes; raises ValueError on invalid JSON"""
+        try:
+            text = self._decoder.decode(data)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"invalid UTF-8 near byte {self.offset}: {e.reason}")
+        self._scan(self._pending + text, final=False)
+
+    def close(self):
+        """Finish the document; raises ValueError if it is incomplete"""
+        try:
+            text = self._decoder.decode(b'', final=True)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"invalid UTF-8 at end of file: {e.reason}")
+        self._scan(self._pending + text, final=True)
+        if self._expect != 'done':
+            raise ValueError("unexpected end of JSON document")
+
+    def _fail(self, message):
+        raise ValueError(f"{message} near character {self.offset}")
+
+    def _scan(self, text, final):
+        pos, end = 0, len(text)
+        match = TOKEN.match
+        while pos < end:
+            if end - pos >= MIN_RUN and self._at_member() and self.offset >= self._no_runs_before.get(len(self._stack), 0):
+                cut = self._run(text, pos, end)
+                if cut is not None:
+                    self.offset += cut - pos
+                    pos = cut
+                    self._expect = 'comma_or_end'
+                    continue
+            m = match(text, pos)
+            if m is None or (not final and m.lastgroup == 'number' and NUMBER_TAIL.fullmatch(text, m.end())):
+                # Possibly a token cut by the chunk boundary
+                rest = WHITESPACE.match(text, pos).end()
+                if rest == end:
+                    pos = end
+                    break
+                if final:
+                    self.offset += rest - pos
+                    self._fail("invalid JSON token")
+                partial = text[rest:]
+                if partial[0] == '"':
+                    if STRING_PREFIX.match(partial).end() != len(partial):
+                        self.offset += rest - pos
+                        self._fail("invalid JSON string")
+                elif len(partial) > MAX_PARTIAL:
+                    self.offset += rest - pos
+                    self._fail("invalid JSON token")
+                self.offset += rest - pos
+                self._pending = partial
+                return
+            self._token(m.lastgroup, m[m.lastgroup])
+            self.offset += m.end() - pos
+            pos = m.end()
+        self._pending = ''
+
+    def _at_member(self):
+        """Whether the next token starts an array element or object member"""
+        if not self._stack:
+            return False
+        if self._stack[-1] == '[':
+            return self._expect in ('value', 'value_or_end')
+        return self._expect in ('key', 'key_or_end')
+
+    def _run(self, text, pos, end):
+        """End of a run of whole members starting at pos that the C parser accepts, or None
+
+        Cut points are guesses (a '}' or ']' followed by ',' or a closing
+        bracket); wrapping the run in the open container's brackets and
+        parsing it only succeeds if the guess really ends a member at this
+        depth, since JSON lexes the same way from the same starting state.
+        """
+        opening = self._stack[-1]
+        closing = ']' if opening == '[' else '}'
+        stop = end
+        for _ in range(RUN_ATTEMPTS):
+            cut = max(text.rfind('}', pos, stop), text.rfind(']', pos, stop)) + 1
+            while cut and AFTER_MEMBER.match(text, cut) is None:
+                stop = cut - 1
+                cut = max(text.rfind('}', pos, stop), text.rfind(']', pos, stop)) + 1
+            if cut - pos < MIN_RUN:
+                break
+            try:
+                json.loads(f"{opening}{text[pos:cut]}{closing}")
+                return cut
+            except json.JSONDecodeError as e:
+                # Only a cut before the error can help (e.pos counts the added
+                # bracket); halving bounds the work if this container spans the chunk
+                stop = min(cut, pos + e.pos, pos + (cut - pos) // 2) - 1
+            except RecursionError:
+                stop = pos + (cut - pos) // 2
+        # This container may run past the chunk, or be invalid: scan it token
+        # by token up to here, still trying runs inside its members
+        self._no_runs_before[len(self._stack)] = self.offset + (stop - pos)
+        return None
+
+    def _token(self, kind, value):
+        expect = self._expect
+        if expect in ('value', 'value_or_end'):
+            if kind == 'punct':
+                if value == '{':
+                    self._stack.append('{')
+                    self._expect = 'key_or_end'
+                elif value == '[':
+                    self._stack.append('[')
+                    self._expect = 'value_or_end'
+                elif value == ']' and expect == 'value_or_end':
+                    self._close()
+                else:
+                    self._fail(f"unexpected '{value}'")
+            else:
+                self._after_value()
+        elif expect in ('key', 'key_or_end'):
+            if kind == 'string':
+                self._expect = 'colon'
+            elif value == '}' and expect == 'key_or_end':
+                self._close()
+            else:
+                self._fail("expected an object key")
+        elif expect == 'colon':
+            if value != ':':
+                self._fail("expected ':'")
+            self._expect = 'value'
+        elif expect == 'comma_or_end':
+            top = self._stack[-1]
+            if value == ',':
+                self._expect = 'key' if top == '{' else 'value'
+            elif (value == '}' and top == '{') or (value == ']' and top == '['):
+                self._close()
+            else:
+                self._fail("expected ',' or the end of a container")
+        else:
+            self._fail("extra data after the JSON document")
+
+    def _close(self):
+        self._stack.pop()
+        self._after_value()
+
+    def _after_value(self):
+        self._expect = 'comma_or_end' if self._stack else 'done'
+
+def validate_stream(chunks):
+    """Validate an iterable of byte chunks as one JSON document"""
+    validator = JsonValidator()
+    for chunk in chunks:
+        validator.feed(chunk)
+    validator.close()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Offsite backup target for S3-compatible object stores
+Uploads large backups as concurrent multipart transfers that can resume
+after a failure, and skips objects that are already stored with the same checksum
+"""
+
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# S3 rejects multipart parts smaller than 5 MB (except the last one)
+MIN_PART_SIZE = 5 * MB
+UPLOAD_STATE_SUFFIX = '.upload'
+
+def _error_code(exc):
+    """Error code of a botocore ClientError (or a fake raising the same shape)"""
+    return str(getattr(exc, 'response', {}).get('Error', {}).get('Code', ''))
+
+class S3Target:
+    def __init__(self, bucket, prefix='', endpoint_url=None, client=None,
+                 part_size=8 * MB, max_workers=4):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("boto3 is required for offsite backups (pip install boto3)")
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_env(cls):
+        """Build a target from BACKUP_S3_* settings, or None when offsite backups are off"""
+        bucket = os.getenv('BACKUP_S3_BUCKET')
+        if not bucket:
+            return None
+        return cls(
+            bucket=bucket,
+            prefix=os.getenv('BACKUP_S3_PREFIX', 'backups/'),
+            endpoint_url=os.getenv('BACKUP_S3_ENDPOINT_URL') or None,
+            part_size=int(float(os.getenv('BACKUP_S3_PART_SIZE_MB', 8)) * MB),
+            max_workers=int(os.getenv('BACKUP_S3_CONCURRENCY', 4))
+        )
+
+    def key_for(self, path):
+        return f"{self.prefix}{Path(path).name}"
+
+    def has_object(self, key, checksum):
+        """True if the object exists and was uploaded with the same checksum"""
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if _error_code(e) in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return head.get('Metadata', {}).get('sha256') == checksum
+
+    def upload(self, path, checksum):
+        """Upload a backup file; returns False if an identical object was already there"""
+        path = Path(path)
+        key = self.key_for(path)
+        if self.has_object(key, checksum):
+            logger.info(f"Offsite copy of {path.name} is up to date, skipping")
+            return False
+
+        size = path.stat().st_size
+        if size <= self.part_size:
+            with open(path, 'rb') as f:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=f, Metadata={'sha256': checksum})
+        else:
+            self._multipart_upload(path, key, checksum, size)
+
+        logger.info(f"Uploaded {path.name} to s3://{self.bucket}/{key} ({size} bytes)")
+        return True
+
+    def _state_path(self, path):
+        return path.with_name(path.name + UPLOAD_STATE_SUFFIX)
+
+    def _resume_or_start(self, path, key, checksum, size):
+        """Return (upload_id, {part_number: etag}) for an unfinished or new multipart upload"""
+        state_path = self._state_path(path)
+        if state_path.exists():
+            state = json.loads(state_path.read_text())
+            if state.get('key') == key and state.get('sha256') == checksum:
+                if state.get('part_size') == self.part_size and state.get('size') == size:
+                    try:
+                        done = self._uploaded_parts(key, state['upload_id'], size)
+                        logger.info(f"Resuming upload of {path.name}: {len(done)} parts already stored")
+                        return state['upload_id'], done
+                    except Exception as e:
+                        if _error_code(e) != 'NoSuchUpload':
+                            raise
+                        logger.warning(f"Previous upload of {path.name} expired, starting over")
+                else:
+                    # Parts cut at another size can't be mixed with new ones
+                    logger.warning(f"Part size changed since {path.name} started uploading, starting over")
+                    self._abort(key, state['upload_id'])
+
+        upload = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, Metadata={'sha256': checksum})
+        state_path.write_text(json.dumps({
+            'key': key, 'upload_id': upload['UploadId'], 'sha256': checksum,
+            'part_size': self.part_size, 'size': size
+        }))
+        return upload['UploadId'], {}
+
+    def _abort(self, key, upload_id):
+        """Abort an abandoned multipart upload so its parts stop being billed"""
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+        except Exception as e:
+            if _error_code(e) != 'NoSuchUpload':
+                raise
+
+    def _part_length(self, part_number, size):
+        return min(self.part_size, size - (part_number - 1) * self.part_size)
+
+    def _uploaded_parts(self, key, upload_id, size):
+        """Parts already stored for a multipart upload, skipping any of the wrong length"""
+        part_count = (size + self.part_size - 1) // self.part_size
+        done = {}
+        marker = 0
+        while True:
+            page = self.client.list_parts(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumberMarker=marker)
+            for part in page.get('Parts', []):
+                number = part['PartNumber']
+                if number <= part_count and part.get('Size') == self._part_length(number, size):
+                    done[number] = part['ETag']
+            if not page.get('IsTruncated'):
+                return done
+            marker = page['NextPartNumberMarker']
+
+    def _upload_part(self, path, key, upload_id, part_number):
+        with open(path, 'rb') as f:
+            f.seek((part_number - 1) * self.part_size)
+            body = f.read(self.part_size)
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+        return part_number, response['ETag']
+
+    def _multipart_upload(self, path, key, checksum, size):
+        """Upload parts concurrently; the state file lets an interrupted upload resume"""
+        upload_id, etags = self._resume_or_start(path, key, checksum, size)
+        part_count = (size + self.part_size - 1) // self.part_size
+        pending = [n for n in range(1, part_count + 1) if n not in etags]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._upload_part, path, key, upload_id, n) for n in pending]
+            for future in futures:
+                part_number, etag = future.result()
+                etags[part_number] = etag
+
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': n, 'ETag': etags[n]} for n in range(1, part_count + 1)]}
+        )
+        self._state_path(path).unlink(missing_ok=True)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Shared I/O throttle for background backup jobs
+A token bucket measured in bytes: readers call consume() after each chunk
+and sleep off whatever they read beyond the configured rate. One bucket is
+shared by all worker threads, so the limit applies to the job as a whole.
+"""
+
+import time
+import threading
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        # rate <= 0 disables throttling
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """Take amount bytes from the bucket, sleeping if it is in debt"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
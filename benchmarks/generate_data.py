@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data.json generator
+Writes data files in the same shape as data/data.json with any number of
+users (1k .. 10M). The same --users/--seed always produce the same bytes,
+and users are streamed to disk so large files don't need to fit in memory.
+
+    python3 benchmarks/generate_data.py --users 1000000 --output /tmp/data.json
+"""
+
+import json
+import random
+import argparse
+from datetime import datetime, timezone
+
+FIRST_NAMES = ['John', 'Jane', 'Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Heidi',
+               'Ivan', 'Judy', 'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Walter']
+LAST_NAMES = ['Smith', 'Doe', 'Johnson', 'Brown', 'Garcia', 'Miller', 'Davis', 'Martinez', 'Lopez', 'Wilson',
+              'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'White', 'Harris']
+DOMAINS = ['example.com', 'mail.com', 'corp.io', 'company.org', 'startup.dev']
+
+# Signups are spread over 2020-01-01 .. 2025-01-01
+SIGNUP_START = int(datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp())
+SIGNUP_SPAN = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()) - SIGNUP_START
+
+def synthetic_users(count, seed=42):
+    """Yield count user records, identical for the same seed"""
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created = SIGNUP_START + rng.randrange(SIGNUP_SPAN)
+        yield {
+            'id': i,
+            'name': f"{first} {last}",
+            'email': f"{first.lower()}.{last.lower()}{i}@{rng.choice(DOMAINS)}",
+            'created_at': datetime.fromtimestamp(created, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+
+def write_data_file(path, count, seed=42):
+    """Stream a data.json with count users to path; returns bytes written"""
+    written = 0
+    with open(path, 'w') as f:
+        def write(text):
+            nonlocal written
+            written += f.write(text)
+
+        write('{"users": [')
+        for i, user in enumerate(synthetic_users(count, seed)):
+            write((',\n' if i else '\n') + json.dumps(user))
+        write('\n], ')
+        write('"metrics": ' + json.dumps({'total_users': count, 'system_status': 'operational'}) + ', ')
+        write('"metadata": ' + json.dumps({'version': '1.0.0', 'environment': 'benchmark', 'seed': seed}) + '}\n')
+    return written
+
+def parse_count(value):
+    """Accept 1000, 10k, 1M style counts"""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=parse_count, default=1000, help='number of users, e.g. 1000, 10k, 1M')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='data.json')
+    args = parser.parse_args()
+
+    size = write_data_file(args.output, args.users, args.seed)
+    print(f"Wrote {args.users} users to {args.output} ({size / 1024 / 1024:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Users memory/speed benchmark: list of dicts vs. compact columns
+Compares the json.load list-of-dicts representation with records.UserColumns
+on resident memory (tracemalloc), load time, full serialisation time and
+lookup-by-id latency.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from records import UserColumns
+from generate_data import parse_count, synthetic_users
+
+def traced(build):
+    """(result, retained bytes, peak bytes) of building a structure"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+def timed(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(count, lookups, seed):
+    raw = json.dumps({'users': list(synthetic_users(count, seed))})
+    rng = random.Random(seed)
+    probe_ids = [rng.randint(1, count) for _ in range(lookups)]
+
+    dicts, dict_bytes, dict_peak = traced(lambda: json.loads(raw)['users'])
+    columns, column_bytes, column_peak = traced(lambda: UserColumns.from_dicts(json.loads(raw)['users']))
+
+    by_id = {user['id']: user for user in dicts}
+    results = {
+        'users': count,
+        'dicts': {
+            'retained_bytes': dict_bytes,
+            'peak_bytes': dict_peak,
+            'load_seconds': timed(lambda: json.loads(raw)['users']),
+            'serialise_seconds': timed(lambda: json.dumps(dicts)),
+            # The dict approach needs an id map (or a scan) for lookups
+            'lookup_us': timed(lambda: [by_id[i] for i in probe_ids]) / lookups * 1e6
+        },
+        'columns': {
+            'retained_bytes': column_bytes,
+            'peak_bytes': column_peak,
+            'load_seconds': timed(lambda: UserColumns.from_dicts(json.loads(raw)['users'])),
+            'serialise_seconds': timed(lambda: json.dumps(list(columns.iter_dicts()))),
+            'lookup_us': timed(lambda: [columns.get(i) for i in probe_ids]) / lookups * 1e6
+        }
+    }
+    results['memory_ratio'] = column_bytes / dict_bytes
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='100000,1000000', help='comma-separated user counts, e.g. 100k,1M')
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    all_results = []
+    print(f"{'users':>9} {'layout':>8} {'retained MB':>12} {'peak MB':>9} {'load s':>8} {'dump s':>8} {'lookup us':>10}")
+    for count in (parse_count(size) for size in args.sizes.split(',')):
+        result = run(count, args.lookups, args.seed)
+        all_results.append(result)
+        for layout in ('dicts', 'columns'):
+            r = result[layout]
+            print(f"{count:>9} {layout:>8} {r['retained_bytes'] / 1e6:>12.1f} {r['peak_bytes'] / 1e6:>9.1f} "
+                  f"{r['load_seconds']:>8.2f} {r['serialise_seconds']:>8.2f} {r['lookup_us']:>10.2f}")
+        print(f"{'':>9} columns use {result['memory_ratio']:.0%} of the dict memory")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
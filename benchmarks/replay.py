@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic against a running instance
+Reads the JSON Lines file written by the app's traffic capture, re-issues the
+requests at 1x (or --speed N) of the recorded pacing with bounded concurrency,
+and reports latency percentiles and error rates per endpoint. Event streams
+(SSE) never end, so they are closed on arrival and counted as skipped.
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+REPLAYABLE_METHODS = ('GET', 'HEAD')
+
+def load_capture(path, limit=None):
+    """Captured records in arrival order"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if 'path' in record and 'ts' in record:
+                records.append(record)
+    records.sort(key=lambda r: r['ts'])
+    return records[:limit] if limit else records
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class Replayer:
+    def __init__(self, target, speed, concurrency, timeout):
+        self.target = target.rstrip('/')
+        self.speed = speed
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.results = defaultdict(lambda: {'latencies': [], 'errors': 0, 'lag': []})
+        self.skipped = 0
+        self.streams = 0
+        self._lock = threading.Lock()
+
+    def _issue(self, record, scheduled_at):
+        url = f"{self.target}{record['path']}"
+        if record.get('query'):
+            url += f"?{record['query']}"
+        req = urllib.request.Request(url, method=record['method'], headers=record.get('headers', {}))
+        lag = time.perf_counter() - scheduled_at
+        start = time.perf_counter()
+        error = False
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                if response.headers.get_content_type() == 'text/event-stream':
+                    with self._lock:
+                        self.streams += 1
+                    return
+                response.read()
+        except urllib.error.HTTPError as e:
+            error = e.code >= 500
+        except Exception:
+            error = True
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self.results[record['path']]
+            stats['latencies'].append(elapsed)
+            stats['lag'].append(lag)
+            stats['errors'] += error
+
+    def run(self, records):
+        if not records:
+            return 0.0
+        first_ts = records[0]['ts']
+        start = time.perf_counter()
+        for record in records:
+            if record['method'] not in REPLAYABLE_METHODS:
+                self.skipped += 1
+                continue
+            scheduled_at = start + (record['ts'] - first_ts) / self.speed
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.pool.submit(self._issue, record, scheduled_at)
+        self.pool.shutdown(wait=True)
+        return time.perf_counter() - start
+
+    def report(self, duration):
+        endpoints = {}
+        for path, stats in sorted(self.results.items()):
+            latencies = sorted(stats['latencies'])
+            count = len(latencies)
+            endpoints[path] = {
+                'requests': count,
+                'error_rate': stats['errors'] / count if count else 0.0,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p90_ms': percentile(latencies, 90) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+                'max_dispatch_lag_ms': max(stats['lag']) * 1000 if stats['lag'] else 0.0
+            }
+        total = sum(e['requests'] for e in endpoints.values())
+        return {
+            'target': self.target,
+            'speed': self.speed,
+            'duration_seconds': duration,
+            'requests': total,
+            'skipped_non_replayable': self.skipped,
+            'skipped_streams': self.streams,
+            'achieved_rps': total / duration if duration else 0.0,
+            'endpoints': endpoints
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--file', default='requests.jsonl', help='captured traffic (JSON Lines)')
+    parser.add_argument('--target', default='http://localhost:8000', help='instance to replay against')
+    parser.add_argument('--speed', type=float, default=1.0, help='time scale: 2 replays twice as fast')
+    parser.add_argument('--concurrency', type=int, default=16, help='maximum requests in flight')
+    parser.add_argument('--timeout', type=float, default=10.0, help='per-request timeout in seconds')
+    parser.add_argument('--limit', type=int, help='replay only the first N captured requests')
+    parser.add_argument('--json', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    records = load_capture(args.file, args.limit)
+    if not records:
+        print(f"No captured requests in {args.file}")
+        sys.exit(1)
+
+    replayer = Replayer(args.target, args.speed, args.concurrency, args.timeout)
+    print(f"Replaying {len(records)} requests against {args.target} at {args.speed}x...")
+    report = replayer.report(replayer.run(records))
+
+    print(f"\n{'endpoint':<30} {'reqs':>6} {'err %':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for path, e in report['endpoints'].items():
+        print(f"{path:<30} {e['requests']:>6} {e['error_rate'] * 100:>6.1f} {e['p50_ms']:>8.1f} "
+              f"{e['p90_ms']:>8.1f} {e['p99_ms']:>8.1f} {e['max_ms']:>8.1f}")
+    print(f"\n{report['requests']} requests in {report['duration_seconds']:.1f}s "
+          f"({report['achieved_rps']:.1f} req/s), {report['skipped_non_replayable']} skipped, "
+          f"{report['skipped_streams']} event streams closed")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
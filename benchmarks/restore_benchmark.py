@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Restore-time benchmark for the backup system
+Measures verified, atomic restore time against data file size
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import logging
+import argparse
+from pathlib import Path
+
+# Keep the backup log out of the working tree
+os.environ.setdefault('BACKUP_LOG_PATH', os.path.join(tempfile.gettempdir(), 'restore_benchmark', 'backup.log'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backup'))
+
+from backup_script import BackupManager
+import generate_data
+
+# Average size of a generated user record, used to hit a target file size
+APPROX_RECORD_BYTES = 116
+
+logging.getLogger('backup_script').setLevel(logging.WARNING)
+
+def write_data_file(path, target_bytes):
+    """Write a generated users data file of roughly target_bytes"""
+    generate_data.write_data_file(path, max(1, target_bytes // APPROX_RECORD_BYTES))
+
+def run(sizes_mb, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        for size_mb in sizes_mb:
+            source = workdir / 'data.json'
+            write_data_file(source, int(size_mb * 1024 * 1024))
+            manager = BackupManager(source_file=source, backup_dir=workdir / f'backup_{size_mb}')
+            manager.create_backup()
+            backup_name = manager.list_backups()[0].name
+            size = (manager.backup_dir / backup_name).stat().st_size
+
+            timings = {'dry_run': [], 'restore': []}
+            for _ in range(repeat):
+                for mode in timings:
+                    start = time.perf_counter()
+                    ok = manager.restore_backup(backup_name, dry_run=(mode == 'dry_run'))
+                    timings[mode].append(time.perf_counter() - start)
+                    if not ok:
+                        raise RuntimeError(f"restore failed at {size_mb} MB")
+
+            best_restore = min(timings['restore'])
+            results.append({
+                'size_bytes': size,
+                'dry_run_seconds': min(timings['dry_run']),
+                'restore_seconds': best_restore,
+                'restore_mb_per_second': size / 1024 / 1024 / best_restore
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1,10,100', help='comma-separated data sizes in MB')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size (best is reported)')
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    results = run([float(s) for s in args.sizes.split(',')], args.repeat)
+
+    print(f"{'size (MB)':>10} {'verify (s)':>11} {'restore (s)':>12} {'MB/s':>8}")
+    for r in results:
+        print(f"{r['size_bytes'] / 1024 / 1024:>10.1f} {r['dry_run_seconds']:>11.3f} "
+              f"{r['restore_seconds']:>12.3f} {r['restore_mb_per_second']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Data-size scaling benchmark
+Generates a synthetic data.json per size (see generate_data.py), then in a
+fresh process per size measures the API endpoints and backup/restore against
+it: latency, throughput, peak RSS and bytes written.
+
+    python3 benchmarks/scaling_benchmark.py --sizes 1k,10k,100k,1M --json scaling.json
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import argparse
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backup'))
+
+import generate_data
+
+ENDPOINTS = {
+    'api_data': '/api/data',
+    'api_stats': '/api/stats',
+    'search_prefix': '/api/users/search?q=jo',
+    'search_two_words': '/api/users/search?q=alice+sm',
+    'health': '/health'
+}
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def written_bytes():
+    """Bytes this process has passed to write(), or None off Linux"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def bytes_since(before):
+    after = written_bytes()
+    return None if before is None or after is None else after - before
+
+def time_endpoint(client, path, requests):
+    latencies = []
+    size = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - t)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+        size = len(response.data)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': requests,
+        'response_bytes': size,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'requests_per_second': requests / elapsed
+    }
+
+def measure(data_file, workdir, requests):
+    """Runs inside the per-size worker process"""
+    # Measure the real work, not the response cache or the per-request log
+    os.environ.update({
+        'DATA_FILE': data_file,
+        'RESPONSE_CACHE': 'false',
+        'BACKUP_LOG_PATH': os.path.join(workdir, 'backup.log')
+    })
+    import logging
+    from app import app, data_store
+    from backup_script import BackupManager
+    logging.getLogger().setLevel(logging.WARNING)
+
+    result = {'peak_rss_after_import_bytes': peak_rss_bytes()}
+    start = time.perf_counter()
+    data_store.get()
+    result['load_seconds'] = time.perf_counter() - start
+    result['peak_rss_after_load_bytes'] = peak_rss_bytes()
+
+    client = app.test_client()
+    result['endpoints'] = {
+        name: time_endpoint(client, path, requests if name != 'api_data' else max(1, requests // 10))
+        for name, path in ENDPOINTS.items()
+    }
+
+    manager = BackupManager(source_file=data_file, backup_dir=os.path.join(workdir, 'backups'))
+    data_bytes = os.path.getsize(data_file)
+    before = written_bytes()
+    start = time.perf_counter()
+    if not manager.create_backup():
+        raise RuntimeError('backup failed')
+    elapsed = time.perf_counter() - start
+    result['backup'] = {
+        'seconds': elapsed,
+        'mb_per_second': data_bytes / 1024 / 1024 / elapsed,
+        'bytes_written': bytes_since(before)
+    }
+
+    backup_name = manager.list_backups()[0].name
+    for mode in ('dry_run', 'restore'):
+        before = written_bytes()
+        start = time.perf_counter()
+        if not manager.restore_backup(backup_name, dry_run=(mode == 'dry_run')):
+            raise RuntimeError(f"{mode} failed")
+        elapsed = time.perf_counter() - start
+        result[mode] = {
+            'seconds': elapsed,
+            'mb_per_second': data_bytes / 1024 / 1024 / elapsed,
+            'bytes_written': bytes_since(before)
+        }
+
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+def run_size(users, seed, requests, keep_dir=None):
+    """Generate one data file and measure it in a fresh process"""
+    with tempfile.TemporaryDirectory(dir=keep_dir) as workdir:
+        data_file = os.path.join(workdir, 'data.json')
+        start = time.perf_counter()
+        data_bytes = generate_data.write_data_file(data_file, users, seed)
+        generate_seconds = time.perf_counter() - start
+
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', data_file, '--workdir', workdir, '--requests', str(requests)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+    return {'users': users, 'data_bytes': data_bytes, 'generate_seconds': generate_seconds, **result}
+
+def print_summary(results):
+    print(f"{'users':>10} {'data (MB)':>10} {'load (s)':>9} {'api_data p50 (ms)':>18} "
+          f"{'search p50 (ms)':>16} {'backup (s)':>11} {'restore (s)':>12} {'peak RSS (MB)':>14}")
+    for r in results:
+        print(f"{r['users']:>10} {r['data_bytes'] / 1024 / 1024:>10.1f} {r['load_seconds']:>9.3f} "
+              f"{r['endpoints']['api_data']['p50_ms']:>18.2f} {r['endpoints']['search_prefix']['p50_ms']:>16.3f} "
+              f"{r['backup']['seconds']:>11.3f} {r['restore']['seconds']:>12.3f} "
+              f"{r['peak_rss_bytes'] / 1024 / 1024:>14.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,10k,100k,1M', help='comma-separated user counts, e.g. 1k,1M,10M')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint (api_data gets a tenth)')
+    parser.add_argument('--tmpdir', help='where to generate data files (default: system temp)')
+    parser.add_argument('--json', default='scaling_report.json', help='write the report to this JSON file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.workdir, args.requests)))
+        return
+
+    results = []
+    for size in args.sizes.split(','):
+        users = generate_data.parse_count(size)
+        print(f"Measuring {users} users...", file=sys.stderr)
+        results.append(run_size(users, args.seed, args.requests, args.tmpdir))
+
+    print_summary(results)
+    with open(args.json, 'w') as f:
+        json.dump({'seed': args.seed, 'requests': args.requests, 'results': results}, f, indent=2)
+    print(f"Report written to {args.json}")
+
+if __name__ == '__main__':
+    main()
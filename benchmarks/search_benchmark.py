@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+User search benchmark
+Builds the in-memory search index over synthetic users and reports build time,
+approximate index memory and query latency for prefix and multi-word queries.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from search import UserIndex
+from runtime_metrics import current_rss_bytes
+from generate_data import FIRST_NAMES, LAST_NAMES, parse_count, synthetic_users
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def time_queries(index, queries, limit):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'queries': len(latencies),
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'max_us': latencies[-1] * 1e6
+    }
+
+def run(count, query_count, limit, seed):
+    users = list(synthetic_users(count, seed))
+    gc.collect()
+    rss_before = current_rss_bytes()
+
+    index = UserIndex()
+    start = time.perf_counter()
+    index.reset(users)
+    build_seconds = time.perf_counter() - start
+    gc.collect()
+    index_bytes = current_rss_bytes() - rss_before
+
+    rng = random.Random(seed)
+    names = [rng.choice(FIRST_NAMES).lower() for _ in range(query_count)]
+    workloads = {
+        'prefix_1_char': [name[:1] for name in names],
+        'prefix_3_chars': [name[:3] for name in names],
+        'full_word': names,
+        'two_words_prefix': [f"{name} {rng.choice(LAST_NAMES).lower()[:2]}" for name in names],
+        'email_fragment': [f"{name}.{rng.choice(LAST_NAMES).lower()}{rng.randint(1, count)}" for name in names],
+        'no_match': [f"zz{name}" for name in names]
+    }
+
+    return {
+        'users': count,
+        'distinct_terms': len(index.postings),
+        'build_seconds': build_seconds,
+        'index_rss_bytes': index_bytes,
+        'index_rss_bytes_per_user': index_bytes / count,
+        'limit': limit,
+        'queries': {name: time_queries(index, queries, limit) for name, queries in workloads.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=parse_count, default=1_000_000, help='number of users, e.g. 100k, 1M')
+    parser.add_argument('--queries', type=int, default=2000, help='queries per workload')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    result = run(args.users, args.queries, args.limit, args.seed)
+    print(f"{result['users']} users, {result['distinct_terms']} terms")
+    print(f"build: {result['build_seconds']:.2f}s, index memory ~{result['index_rss_bytes'] / 1024 / 1024:.1f} MB "
+          f"({result['index_rss_bytes_per_user']:.0f} B/user, RSS delta)")
+    print(f"\n{'workload':<18} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    for name, stats in result['queries'].items():
+        print(f"{name:<18} {stats['p50_us']:>9.1f} {stats['p99_us']:>9.1f} {stats['max_us']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    main()
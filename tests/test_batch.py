@@ -0,0 +1,43 @@
+import itertools
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from batch import BatchError, parse_batch, run_batch
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+
+    @app.route('/api/status/stream')
+    def status_stream():
+        return Response((f"data: {i}\n\n" for i in itertools.count()), mimetype='text/event-stream')
+
+    @app.route('/api/events')
+    def events():
+        return Response((f"data: {i}\n\n" for i in itertools.count()), mimetype='text/event-stream')
+
+    @app.route('/api/batch', methods=['POST'])
+    def batch():
+        return jsonify({})
+
+    @app.route('/health')
+    def health():
+        return jsonify({'status': 'healthy'})
+
+    return app
+
+@pytest.mark.parametrize('path', ['/api/status/stream', '/api/status/%73tream', '/api/%73tatus/stream?x=1'])
+def test_excluded_endpoints_are_matched_after_decoding(app, path):
+    with pytest.raises(BatchError):
+        parse_batch({'requests': [path]}, 20, app.url_map)
+
+def test_unknown_paths_are_left_to_the_sub_request(app):
+    assert parse_batch({'requests': ['/nope?a=1']}, 20, app.url_map) == [('/nope', 'a=1')]
+
+def test_streamed_responses_are_not_buffered(app):
+    specs = parse_batch({'requests': ['/api/events', '/health']}, 20, app.url_map)
+    results = run_batch(app, specs, 'http://localhost/', {}, 2)
+    assert results[0]['status'] == 400
+    assert results[1]['status'] == 200
+    assert results[1]['body'] == {'status': 'healthy'}
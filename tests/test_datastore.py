@@ -0,0 +1,209 @@
+import json
+import os
+
+import pytest
+
+from datastore import ChangeLog, DataStore
+
+def user(user_id, name='User'):
+    return {'id': user_id, 'name': name, 'email': f"user{user_id}@example.com"}
+
+class Writer:
+    """Rewrites the data file with a strictly later mtime so every write is a new version"""
+    def __init__(self, path):
+        self.path = path
+        self.mtime_ns = 1_700_000_000_000_000_000
+
+    def write(self, users, **sections):
+        self.path.write_text(json.dumps({'users': users, **sections}))
+        self.mtime_ns += 1_000_000
+        os.utime(self.path, ns=(self.mtime_ns, self.mtime_ns))
+
+@pytest.fixture
+def writer(tmp_path):
+    return Writer(tmp_path / 'data.json')
+
+def make_store(writer, **kwargs):
+    return DataStore(str(writer.path), check_interval=0, stale_while_revalidate=False, **kwargs)
+
+def ids(users):
+    return sorted(u['id'] for u in users)
+
+def test_add_then_remove_across_versions_nets_out(writer):
+    writer.write([user(1)])
+    store = make_store(writer)
+    _, since = store.get_versioned()
+    writer.write([user(1), user(2)])
+    store.refresh()
+    writer.write([user(1)])
+    delta = store.changes_since(since)
+    assert delta['full'] is False
+    assert (delta['added'], delta['updated'], delta['removed']) == ([], [], [])
+
+def test_remove_then_readd_is_an_update(writer):
+    writer.write([user(1), user(2)])
+    store = make_store(writer)
+    _, since = store.get_versioned()
+    writer.write([user(1)])
+    store.refresh()
+    writer.write([user(1), user(2, 'Back')])
+    delta = store.changes_since(since)
+    assert delta['added'] == [] and delta['removed'] == []
+    assert delta['updated'] == [user(2, 'Back')]
+
+def test_delta_nets_adds_updates_and_removes(writer):
+    writer.write([user(1), user(2), user(3)])
+    store = make_store(writer)
+    _, since = store.get_versioned()
+    writer.write([user(1, 'Changed'), user(3), user(4)])
+    store.refresh()
+    writer.write([user(1, 'Changed'), user(4), user(5)])
+    delta = store.changes_since(since)
+    assert ids(delta['added']) == [4, 5]
+    assert delta['updated'] == [user(1, 'Changed')]
+    assert sorted(delta['removed']) == [2, 3]
+
+def test_changed_sections_are_included(writer):
+    writer.write([user(1)], metrics={'total_users': 1}, settings={'a': 1})
+    store = make_store(writer)
+    _, since = store.get_versioned()
+    writer.write([user(1)], metrics={'total_users': 2}, settings={'a': 1})
+    delta = store.changes_since(since)
+    assert delta['sections'] == {'metrics': {'total_users': 2}}
+
+def test_current_version_gives_empty_delta(writer):
+    writer.write([user(1)])
+    store = make_store(writer)
+    _, version = store.get_versioned()
+    delta = store.changes_since(version)
+    assert delta['full'] is False and delta['version'] == version
+    assert (delta['added'], delta['updated'], delta['removed'], delta['sections']) == ([], [], [], {})
+
+def test_unknown_version_gives_full_snapshot(writer):
+    writer.write([user(1)])
+    store = make_store(writer)
+    delta = store.changes_since(12345)
+    assert delta['full'] is True
+    assert delta['version'] == store.version
+
+def test_versions_never_go_backwards(writer):
+    writer.write([user(1)])
+    store = make_store(writer)
+    _, first = store.get_versioned()
+    writer.mtime_ns -= 10_000_000
+    writer.write([user(2)])
+    _, second = store.get_versioned()
+    assert second > first
+
+def test_evicted_version_falls_back_to_full_snapshot(writer):
+    writer.write([user(1)])
+    store = make_store(writer, change_log=ChangeLog(max_versions=2))
+    _, oldest = store.get_versioned()
+    versions = [oldest]
+    for n in range(2, 5):
+        writer.write([user(i) for i in range(1, n + 1)])
+        versions.append(store.get_versioned()[1])
+    assert store.changes_since(oldest)['full'] is True
+    assert ids(store.changes_since(versions[1])['added']) == [3, 4]
+    assert ids(store.changes_since(versions[2])['added']) == [4]
+
+def test_record_budget_evicts_oldest_versions(writer):
+    writer.write([user(1)])
+    store = make_store(writer, change_log=ChangeLog(max_records=3))
+    _, first = store.get_versioned()
+    writer.write([user(1), user(2), user(3)])
+    _, second = store.get_versioned()
+    writer.write([user(1), user(2), user(3), user(4), user(5)])
+    assert store.changes_since(first)['full'] is True
+    assert ids(store.changes_since(second)['added']) == [4, 5]
+
+def test_oversized_change_clears_history(writer):
+    writer.write([user(1)])
+    store = make_store(writer, change_log=ChangeLog(max_records=2))
+    _, first = store.get_versioned()
+    writer.write([user(1), user(2)])
+    _, second = store.get_versioned()
+    writer.write([user(i) for i in range(1, 6)])
+    assert store.changes_since(first)['full'] is True
+    assert store.changes_since(second)['full'] is True
+
+def test_non_object_document_clears_history(writer):
+    writer.write([user(1)])
+    store = make_store(writer)
+    _, since = store.get_versioned()
+    writer.path.write_text(json.dumps([1, 2, 3]))
+    writer.mtime_ns += 1_000_000
+    os.utime(writer.path, ns=(writer.mtime_ns, writer.mtime_ns))
+    delta = store.changes_since(since)
+    assert delta['full'] is True and delta['data'] == [1, 2, 3]
+
+def test_users_without_ids_are_counted_but_not_indexed(writer):
+    from search import UserIndex
+    from user_stats import UserStats
+    writer.write([user(1, 'Ann'), user(2, 'Ann')])
+    store = make_store(writer)
+    stats, index = UserStats(), UserIndex()
+    store.add_listener(stats)
+    store.add_listener(index)
+    _, since = store.get_versioned()
+    writer.write([user(1, 'Ann'), user(2, 'Ann'), {'name': 'Ann Anonymous'}])
+    for _ in range(3):
+        store.get()
+        assert stats.snapshot()['total_users'] == 3
+    assert sorted(index.search('ann')[0]) == [1, 2]
+    assert index.search('anonymous') == ([], False)
+    assert store.changes_since(since)['full'] is True
+
+    _, since = store.get_versioned()
+    writer.write([user(1, 'Ann'), {'name': 'Ann Anonymous'}])
+    delta = store.changes_since(since)
+    assert delta['full'] is False and delta['removed'] == [2]
+    assert stats.snapshot()['total_users'] == 2
+
+class FlakyListener:
+    def __init__(self, fail_apply=True, fail_reset=False):
+        self.fail_apply = fail_apply
+        self.fail_reset = fail_reset
+        self.armed = False
+        self.ids = []
+
+    def reset(self, users):
+        users = list(users)
+        if self.armed and self.fail_reset:
+            raise RuntimeError('reset failed')
+        self.ids = sorted(u['id'] for u in users)
+
+    def apply(self, added, updated, removed):
+        if self.armed and self.fail_apply:
+            raise RuntimeError('apply failed')
+
+def test_failed_incremental_update_rebuilds_every_listener(writer):
+    from user_stats import UserStats
+    writer.write([user(1), user(2)])
+    store = make_store(writer)
+    stats, flaky = UserStats(), FlakyListener()
+    store.add_listener(stats)
+    store.add_listener(flaky)
+    store.get()
+    flaky.armed = True
+    writer.write([user(1), user(2), user(3)])
+    for _ in range(3):
+        store.get()
+        assert stats.snapshot()['total_users'] == 3
+    assert flaky.ids == [1, 2, 3]
+
+def test_failed_rebuild_leaves_listeners_on_the_served_document(writer):
+    from user_stats import UserStats
+    writer.write([user(1), user(2)])
+    store = make_store(writer)
+    stats, flaky = UserStats(), FlakyListener(fail_reset=True)
+    store.add_listener(stats)
+    store.add_listener(flaky)
+    document, version = store.get_versioned()
+    flaky.armed = True
+    writer.write([user(1), user(2), user(3)])
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            store.get()
+        assert stats.snapshot()['total_users'] == 2
+    assert store.version == version
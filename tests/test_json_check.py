@@ -0,0 +1,68 @@
+import json
+import random
+
+import pytest
+
+from json_check import validate_stream
+
+CASES = [
+    b'{}', b'[]', b' 1 ', b'"a"', b'{"a":[1,2.5e3,-0,true,null,{"b":"\\u00e9\\n}"}]}', b'[NaN,-Infinity]',
+    b'{"\xc3\xa9":1}', b'1e5', b'{"a":{"b":[{}]}}', b'[{"a":"]"},{"b":"{"}]',
+    b'[1,]', b'{"a" 1}', b'{"a":1,}', b'[1 2]', b'01', b'1.', b'"\x01"', b'{"a":1}x', b'', b'   ', b'[',
+    b'"abc', b'tru', b'"\xff"', b'[-]', b'{,}', b'{"a":}', b'[1]]', b'"\\x"', b'[1e]', b'[1,\x00\x00]',
+    b'{} , {}', b'{"a":[{"b":1},{"c":"\x02"}]}', b'[{"a":1} {"b":2}]',
+]
+
+def is_valid(data, chunk_size):
+    try:
+        validate_stream(data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+        return True
+    except ValueError:
+        return False
+
+def json_accepts(data):
+    try:
+        json.loads(data)
+        return True
+    except ValueError:
+        return False
+
+@pytest.mark.parametrize('data', CASES)
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 4096])
+def test_agrees_with_json_loads(data, chunk_size):
+    assert is_valid(data, chunk_size) == json_accepts(data)
+
+def test_agrees_with_json_loads_on_corrupted_documents():
+    rng = random.Random(7)
+    users = [{'id': i, 'name': f"User {i}", 'email': f"user{i}@example.com"} for i in range(500)]
+    document = json.dumps({'users': users, 'metrics': {'total_users': 500}}, indent=2).encode()
+    assert is_valid(document, 1000)
+    for _ in range(200):
+        corrupted = bytearray(document)
+        for _ in range(rng.randint(1, 3)):
+            corrupted[rng.randrange(len(corrupted))] = rng.choice(b'{}[]",:0a \x00\\')
+        corrupted = bytes(corrupted)
+        for chunk_size in (97, 4096):
+            assert is_valid(corrupted, chunk_size) == json_accepts(corrupted)
+
+def test_member_runs_agree_with_json_loads():
+    # Large chunks take the run fast path; brackets inside strings and nested
+    # members make the guessed cut points wrong now and then
+    rng = random.Random(11)
+    users = [
+        {'id': i, 'name': f'U "}}, ]{i}', 'tags': [{'t': 'a]'}, [1, [2, {}]]], 'address': {'geo': {'x': []}}}
+        for i in range(300)
+    ]
+    documents = [
+        json.dumps({'users': users, 'metrics': {'recent': [users[:50]]}}, indent=1).encode(),
+        json.dumps({str(i): user for i, user in enumerate(users)}).encode(),
+    ]
+    for document in documents:
+        for chunk_size in (4096, 5000, 65536, 1 << 20):
+            assert is_valid(document, chunk_size)
+        for _ in range(60):
+            corrupted = bytearray(document)
+            corrupted[rng.randrange(len(corrupted))] = rng.choice(b'{}[]",:0a \x00\\')
+            corrupted = bytes(corrupted)
+            chunk_size = rng.choice((4096, 7000, 65536))
+            assert is_valid(corrupted, chunk_size) == json_accepts(corrupted)
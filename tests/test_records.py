@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from flask import Flask
+
+from datastore import DataStore
+from records import RecordsJSONProvider, UserColumns, diff_users
+
+USERS = [
+    {'id': 1, 'name': 'Jane Doe', 'email': 'jane@example.com', 'created_at': '2024-01-15T10:30:00Z'},
+    {'id': 2, 'name': 'Jane Doe', 'email': 'no-at-sign', 'created_at': '1970-01-01T00:00:00Z'},
+    # Non-canonical timestamps and extra or missing fields stay verbatim
+    {'id': 3, 'name': 'Bob', 'email': 'bob@example.com', 'created_at': '2024-01-15T10:30:00+00:00'},
+    {'id': 4, 'name': 'Bob', 'email': 'bob@example.com', 'created_at': '2024-02-30T10:30:00Z'},
+    {'id': 5, 'name': 'Eve', 'email': 'eve@example.com', 'created_at': '2024-01-15T10:30:00Z', 'role': 'admin'},
+    {'id': 6, 'name': None, 'email': 'x@example.com'},
+    {'id': 7, 'name': 'Zed', 'email': 'z@corp.io', 'created_at': '2024-1-15T10:30:00Z'},
+]
+
+def encode(app, value):
+    with app.app_context():
+        return json.loads(app.json.dumps(value))
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = RecordsJSONProvider(app)
+    return app
+
+@pytest.mark.parametrize('users', [
+    USERS,
+    # Ids outside int64, non-int ids and unsorted ids switch index strategies
+    [dict(USERS[0], id=2**63), dict(USERS[0], id=-2**63 - 1), dict(USERS[1], id='abc'), dict(USERS[0], id=1.5)],
+    [dict(USERS[0], id=5), dict(USERS[0], id=3), dict(USERS[1], id=4)],
+    [],
+])
+def test_columns_round_trip_exactly(app, users):
+    columns = UserColumns.from_dicts(users)
+    assert list(columns.iter_dicts()) == users
+    assert encode(app, {'users': columns}) == {'users': users}
+    for user in users:
+        assert columns.get(user['id']) == user
+
+def test_rows_are_independent_copies():
+    columns = UserColumns.from_dicts(USERS)
+    columns.row(4)['role'] = 'changed'
+    assert columns.row(4)['role'] == 'admin'
+
+def test_diff_users():
+    old = UserColumns.from_dicts(USERS[:3])
+    new = UserColumns.from_dicts([USERS[0], dict(USERS[1], name='Renamed'), USERS[3]])
+    added, updated, removed = diff_users(old, new)
+    assert added == [USERS[3]]
+    assert updated == [(USERS[1], dict(USERS[1], name='Renamed'))]
+    assert removed == [USERS[2]]
+
+def test_diff_users_matches_users_without_ids_by_content():
+    anonymous = [{'name': 'No Id'}, {'id': None, 'name': 'Null'}, {'id': [1], 'name': 'List'}]
+    old = UserColumns.from_dicts(USERS[:2] + anonymous)
+    new = UserColumns.from_dicts(USERS[:2] + anonymous[1:] + [{'name': 'Other'}])
+    assert old.get(None) is None and old.get([1]) is None
+    added, updated, removed = diff_users(old, new)
+    assert (added, updated, removed) == ([{'name': 'Other'}], [], [{'name': 'No Id'}])
+    assert diff_users(new, new) == ([], [], [])
+
+@pytest.mark.parametrize('document', [
+    {'tenant': 'acme', 'items': [1, 2]},
+    [1, 2, 3],
+    {'users': 'not a list'},
+    {'users': [1, 2]},
+    {'users': USERS, 'metrics': {'total_users': len(USERS)}},
+])
+def test_store_serves_documents_unchanged(app, tmp_path, document):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps(document))
+    assert encode(app, DataStore(str(path)).get()) == document
@@ -0,0 +1,110 @@
+import hashlib
+
+import pytest
+
+import remote
+from fake_s3 import FakeClientError, FakeS3Client
+from remote import S3Target
+
+PART = 1024
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    # Real S3 needs 5 MB parts; the fake takes any size
+    monkeypatch.setattr(remote, 'MIN_PART_SIZE', 1)
+
+def write_backup(path, size):
+    data = bytes(i % 251 for i in range(size))
+    path.write_bytes(data)
+    return data, hashlib.sha256(data).hexdigest()
+
+class FailingClient(FakeS3Client):
+    """Fails one part upload, like a dropped connection"""
+    def __init__(self, fail_part):
+        super().__init__()
+        self.fail_part = fail_part
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber == self.fail_part:
+            self.fail_part = None
+            raise FakeClientError('RequestTimeout', 'UploadPart')
+        return super().upload_part(Bucket, Key, UploadId, PartNumber, Body)
+
+def stored(client, key):
+    return client.objects[('backups', key)]
+
+def test_small_file_uses_put_and_is_skipped_when_unchanged(tmp_path):
+    path = tmp_path / 'data_backup_1.json'
+    data, checksum = write_backup(path, PART // 2)
+    client = FakeS3Client()
+    target = S3Target('backups', prefix='b/', client=client, part_size=PART)
+
+    assert target.upload(path, checksum) is True
+    assert stored(client, 'b/data_backup_1.json') == {'Body': data, 'Metadata': {'sha256': checksum}}
+    assert target.upload(path, checksum) is False
+    assert client.calls.count('put_object') == 1
+
+def test_changed_checksum_is_uploaded_again(tmp_path):
+    path = tmp_path / 'data_backup_1.json'
+    _, checksum = write_backup(path, PART // 2)
+    client = FakeS3Client()
+    target = S3Target('backups', client=client, part_size=PART)
+    target.upload(path, checksum)
+
+    data, checksum = write_backup(path, PART // 3)
+    assert target.upload(path, checksum) is True
+    assert stored(client, 'data_backup_1.json')['Body'] == data
+
+def test_large_file_uploads_concurrent_parts(tmp_path):
+    path = tmp_path / 'data_backup_1.json'
+    data, checksum = write_backup(path, PART * 7 + 100)
+    client = FakeS3Client()
+    target = S3Target('backups', client=client, part_size=PART, max_workers=4)
+
+    assert target.upload(path, checksum) is True
+    assert stored(client, 'data_backup_1.json') == {'Body': data, 'Metadata': {'sha256': checksum}}
+    assert client.calls.count('upload_part') == 8
+    assert not (tmp_path / 'data_backup_1.json.upload').exists()
+
+def test_interrupted_upload_resumes_from_stored_parts(tmp_path):
+    path = tmp_path / 'data_backup_1.json'
+    data, checksum = write_backup(path, PART * 5)
+    client = FailingClient(fail_part=3)
+    target = S3Target('backups', client=client, part_size=PART, max_workers=1)
+
+    with pytest.raises(FakeClientError):
+        target.upload(path, checksum)
+    assert (tmp_path / 'data_backup_1.json.upload').exists()
+    uploaded_before = client.calls.count('upload_part')
+
+    assert target.upload(path, checksum) is True
+    assert client.calls.count('create_multipart_upload') == 1
+    # Only the part that failed is sent again
+    assert client.calls.count('upload_part') - uploaded_before == 1
+    assert stored(client, 'data_backup_1.json')['Body'] == data
+
+def test_resume_with_a_different_part_size_starts_over(tmp_path):
+    path = tmp_path / 'data_backup_1.json'
+    data, checksum = write_backup(path, PART * 12)
+    client = FailingClient(fail_part=2)
+    with pytest.raises(FakeClientError):
+        S3Target('backups', client=client, part_size=PART * 5, max_workers=1).upload(path, checksum)
+
+    assert S3Target('backups', client=client, part_size=PART * 6).upload(path, checksum) is True
+    assert stored(client, 'data_backup_1.json')['Body'] == data
+    assert client.calls.count('abort_multipart_upload') == 1
+    assert client.uploads == {}
+
+def test_stored_parts_of_the_wrong_length_are_uploaded_again(tmp_path):
+    path = tmp_path / 'data_backup_1.json'
+    data, checksum = write_backup(path, PART * 3)
+    client = FailingClient(fail_part=3)
+    target = S3Target('backups', client=client, part_size=PART, max_workers=1)
+    with pytest.raises(FakeClientError):
+        target.upload(path, checksum)
+
+    # A part stored by a client that cut the file differently
+    upload_id = next(iter(client.uploads))
+    client.uploads[upload_id]['Parts'][2] = ('"bad"', b'x' * (PART // 2))
+    assert target.upload(path, checksum) is True
+    assert stored(client, 'data_backup_1.json')['Body'] == data
@@ -0,0 +1,74 @@
+import errno
+import os
+
+import pytest
+from flask import Flask, request
+from prometheus_client import CollectorRegistry, Counter
+
+import response_cache
+from response_cache import CacheEntry, LocalLRU, ResponseCache, SharedStore
+
+def entry(size, ttl=60):
+    return CacheEntry('route', 200, [], b'x' * size, response_cache.time.time() + ttl)
+
+def test_local_lru_is_bounded_by_bytes():
+    lru = LocalLRU(max_entries=100, max_bytes=250, max_entry_bytes=200)
+    for key in 'abc':
+        lru.set(key, entry(100))
+    assert lru.get('a') is None
+    assert lru.get('b') is not None and lru.get('c') is not None
+    assert lru.bytes == 200
+
+    assert lru.set('huge', entry(201)) == []
+    assert lru.get('huge') is None
+
+    lru.set('c', entry(50))
+    assert lru.bytes == 150
+
+@pytest.fixture
+def app(tmp_path):
+    registry = CollectorRegistry()
+    cache = ResponseCache(
+        Counter('requests', '', ['route', 'result'], registry=registry),
+        Counter('evictions', '', ['route', 'tier'], registry=registry),
+        shared_dir=str(tmp_path / 'shared')
+    )
+    app = Flask(__name__)
+    app.calls = 0
+
+    @app.route('/data')
+    @cache.cached(ttl=60)
+    def data():
+        app.calls += 1
+        return 'body'
+
+    @app.route('/page')
+    @cache.cached(ttl=60, query=('page',))
+    def page():
+        app.calls += 1
+        return f"page {request.args.get('page')}"
+
+    return app
+
+def test_unread_query_parameters_share_one_entry(app):
+    client = app.test_client()
+    for i in range(5):
+        assert client.get(f'/data?x={i}').data == b'body'
+    assert app.calls == 1
+
+def test_declared_query_parameters_are_keyed(app):
+    client = app.test_client()
+    assert client.get('/page?page=1&x=1').data == b'page 1'
+    assert client.get('/page?x=2&page=1').headers['X-Cache'] == 'HIT'
+    assert client.get('/page?page=2').data == b'page 2'
+    assert app.calls == 2
+
+def test_failed_shared_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    store = SharedStore(str(tmp_path), max_entries=10, max_entry_bytes=1024)
+
+    def no_space(*args):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+    monkeypatch.setattr(response_cache.os, 'replace', no_space)
+    with pytest.raises(OSError):
+        store.set('key', entry(10))
+    assert os.listdir(tmp_path) == []
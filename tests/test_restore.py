@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('BACKUP_LOG_PATH', str(tmp_path / 'log' / 'backup.log'))
+    from backup_script import BackupManager
+    source = tmp_path / 'data' / 'data.json'
+    source.parent.mkdir()
+    source.write_text(json.dumps({'users': [{'id': 1}]}))
+    return BackupManager(source_file=source, backup_dir=tmp_path / 'backups', remote=None)
+
+def add_backup(manager, name, content, checksum=True):
+    path = manager.backup_dir / name
+    path.write_bytes(content)
+    if checksum:
+        manager._write_checksum(path)
+    return path
+
+def leftovers(manager):
+    return [p.name for p in manager.source_file.parent.iterdir() if p.name != 'data.json']
+
+def test_restore_replaces_data_file(manager):
+    content = json.dumps({'users': [{'id': i} for i in range(5000)]}).encode()
+    add_backup(manager, 'data_backup_20240101_000000.json', content)
+    assert manager.restore_backup('data_backup_20240101_000000.json') is True
+    assert manager.source_file.read_bytes() == content
+    assert leftovers(manager) == []
+    assert len(list(manager.backup_dir.glob('pre_restore_backup_*.json'))) == 1
+
+@pytest.mark.parametrize('content', [b'{"users": [1, 2', b'{"users": [1, 2]} trailing', b''])
+def test_restore_rejects_invalid_json(manager, content):
+    original = manager.source_file.read_bytes()
+    add_backup(manager, 'data_backup_20240101_000000.json', content)
+    assert manager.restore_backup('data_backup_20240101_000000.json') is False
+    assert manager.source_file.read_bytes() == original
+    assert leftovers(manager) == []
+
+def test_restore_rejects_checksum_mismatch(manager):
+    original = manager.source_file.read_bytes()
+    path = add_backup(manager, 'data_backup_20240101_000000.json', b'{"users": []}')
+    path.write_bytes(b'{"users": [1]}')
+    assert manager.restore_backup('data_backup_20240101_000000.json', dry_run=True) is False
+    assert manager.source_file.read_bytes() == original
@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+
+import pytest
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('BACKUP_LOG_PATH', str(tmp_path / 'log' / 'backup.log'))
+    from backup_script import BackupManager
+    source = tmp_path / 'data.json'
+    source.write_text(json.dumps({'users': [{'id': i} for i in range(1000)]}))
+    return BackupManager(source_file=source, backup_dir=tmp_path / 'backups', remote=None)
+
+def add_backup(manager, name, checksum=True):
+    path = manager.backup_dir / name
+    shutil.copy(manager.source_file, path)
+    if checksum:
+        manager._write_checksum(path)
+    return path
+
+def test_scrub_quarantines_corrupt_backups(manager):
+    add_backup(manager, 'data_backup_20240101_000000.json')
+    add_backup(manager, 'data_backup_20240102_000000.json', checksum=False)
+    flipped = add_backup(manager, 'data_backup_20240103_000000.json')
+    data = bytearray(flipped.read_bytes())
+    data[10] ^= 1
+    flipped.write_bytes(bytes(data))
+    truncated = add_backup(manager, 'data_backup_20240104_000000.json', checksum=False)
+    truncated.write_bytes(truncated.read_bytes()[:-5])
+
+    assert manager.scrub(max_workers=2, bytes_per_second=0) is False
+
+    report = json.loads((manager.backup_dir / 'scrub_report.json').read_text())
+    assert report['counts'] == {'ok': 1, 'unverified': 1, 'corrupt': 2, 'error': 0}
+    quarantined = sorted(os.listdir(manager.backup_dir / 'quarantine'))
+    assert quarantined == [
+        'data_backup_20240103_000000.json', 'data_backup_20240103_000000.json.sha256',
+        'data_backup_20240104_000000.json'
+    ]
+    assert sorted(path.name for path in manager.list_backups()) == [
+        'data_backup_20240101_000000.json', 'data_backup_20240102_000000.json'
+    ]
+
+def test_scrub_of_healthy_backups_succeeds(manager):
+    add_backup(manager, 'data_backup_20240101_000000.json')
+    assert manager.scrub(max_workers=1, bytes_per_second=0) is True
+    assert not (manager.backup_dir / 'quarantine').exists()
+
+def test_backups_appear_only_once_complete(manager):
+    assert manager.create_backup() is True
+    (backup,) = manager.list_backups()
+    assert manager._read_checksum(backup) == manager._file_checksum(backup)
+    assert json.loads(backup.read_text())['backup_metadata']['backup_version'] == '1.0'
+    assert sorted(p.name for p in manager.backup_dir.iterdir()) == [backup.name, backup.name + '.sha256']
+
+    # A backup still being written has no checksum yet and must not be scrubbed
+    (manager.backup_dir / '.data_backup_20990101_000000.json.tmp').write_text('{"users": [')
+    assert manager.scrub(max_workers=1, bytes_per_second=0) is True
+    assert len(manager.list_backups()) == 1